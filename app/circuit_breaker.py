@@ -0,0 +1,130 @@
+import logging
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Tuple
+
+from .config import (
+    BREAKER_WINDOW,
+    BREAKER_MIN_CALLS,
+    BREAKER_FAILURE_RATIO,
+    BREAKER_OPEN_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream that is known to be down."""
+
+
+class CircuitBreaker:
+    """
+    Sliding-window circuit breaker.
+    Opens when the failure ratio over the last `window` seconds reaches
+    `failure_ratio` (with at least `min_calls` calls), rejects calls for
+    `open_seconds`, then lets a single probe through to decide whether to close.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window: float = BREAKER_WINDOW,
+        min_calls: int = BREAKER_MIN_CALLS,
+        failure_ratio: float = BREAKER_FAILURE_RATIO,
+        open_seconds: float = BREAKER_OPEN_SECONDS,
+    ):
+        self.name = name
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_ratio = failure_ratio
+        self.open_seconds = open_seconds
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.rejected = 0
+        self._calls: Deque[Tuple[float, bool]] = deque()
+        self._probing = False
+        self._transitions: Deque[Dict[str, Any]] = deque(maxlen=20)
+
+    def before_call(self) -> None:
+        """Raise CircuitOpenError if the call should not be attempted."""
+        if self.state == OPEN:
+            if time.monotonic() - self.opened_at < self.open_seconds:
+                self.rejected += 1
+                raise CircuitOpenError(f"{self.name} circuit is open")
+            self._transition(HALF_OPEN)
+
+        if self.state == HALF_OPEN:
+            if self._probing:
+                self.rejected += 1
+                raise CircuitOpenError(f"{self.name} circuit is half-open, probe in flight")
+            self._probing = True
+
+    def record_success(self) -> None:
+        if self.state == HALF_OPEN:
+            self._probing = False
+            self._calls.clear()
+            self._transition(CLOSED)
+            return
+        self._record(True)
+
+    def record_failure(self) -> None:
+        if self.state == HALF_OPEN:
+            self._probing = False
+            self._open()
+            return
+        self._record(False)
+        failures = sum(1 for _, ok in self._calls if not ok)
+        if (
+            self.state == CLOSED
+            and len(self._calls) >= self.min_calls
+            and failures / len(self._calls) >= self.failure_ratio
+        ):
+            self._open()
+
+    def release(self) -> None:
+        """Give up a half-open probe slot without recording an outcome."""
+        self._probing = False
+
+    def _record(self, ok: bool) -> None:
+        now = time.monotonic()
+        self._calls.append((now, ok))
+        while self._calls and now - self._calls[0][0] > self.window:
+            self._calls.popleft()
+
+    def _open(self) -> None:
+        self.opened_at = time.monotonic()
+        self._calls.clear()
+        self._transition(OPEN)
+
+    def _transition(self, state: str) -> None:
+        logger.warning(
+            "Circuit breaker %s: %s -> %s", self.name, self.state, state,
+            extra={"breaker": self.name, "from_state": self.state, "to_state": state},
+        )
+        self._transitions.append({"from": self.state, "to": state, "at": time.time()})
+        self.state = state
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the breaker state and recent transitions."""
+        failures = sum(1 for _, ok in self._calls if not ok)
+        retry_in = None
+        if self.state == OPEN:
+            retry_in = round(max(0.0, self.open_seconds - (time.monotonic() - self.opened_at)), 1)
+        transitions: List[Dict[str, Any]] = list(self._transitions)
+        return {
+            "name": self.name,
+            "state": self.state,
+            "window_calls": len(self._calls),
+            "window_failures": failures,
+            "rejected": self.rejected,
+            "retry_in": retry_in,
+            "transitions": transitions,
+        }
+
+
+# Shared by every call to SCRAPER_API_URL
+scraper_breaker = CircuitBreaker("scraper_api")
@@ -7,6 +7,85 @@ load_dotenv()
 LINE_CHANNEL_ACCESS_TOKEN = os.getenv("LINE_CHANNEL_ACCESS_TOKEN", "")
 LINE_CHANNEL_SECRET = os.getenv("LINE_CHANNEL_SECRET", "")
 
+# Oracle Cloud scraper API
+SCRAPER_API_URL = os.getenv("SCRAPER_API_URL", "http://140.238.197.186:5000")
+
+# Line Messaging API
+LINE_REPLY_URL = os.getenv("LINE_REPLY_URL", "https://api.line.me/v2/bot/message/reply")
+LINE_PUSH_URL = os.getenv("LINE_PUSH_URL", "https://api.line.me/v2/bot/message/push")
+# Send replies whose reply token expired as push messages (push messages count against the monthly quota)
+LINE_PUSH_FALLBACK = os.getenv("LINE_PUSH_FALLBACK", "false").lower() in ("1", "true", "yes")
+
+# HTTP client timeouts (seconds)
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+SCRAPE_TIMEOUT = float(os.getenv("SCRAPE_TIMEOUT", "30"))
+SCRAPER_API_TIMEOUT = float(os.getenv("SCRAPER_API_TIMEOUT", "10"))
+LINE_API_TIMEOUT = float(os.getenv("LINE_API_TIMEOUT", "10"))
+
+# HTTP connection pool sizes
+SCRAPER_POOL_SIZE = int(os.getenv("SCRAPER_POOL_SIZE", "10"))
+LINE_POOL_SIZE = int(os.getenv("LINE_POOL_SIZE", "20"))
+
+# Circuit breaker for the scraper API
+BREAKER_WINDOW = float(os.getenv("BREAKER_WINDOW", "60"))
+BREAKER_MIN_CALLS = int(os.getenv("BREAKER_MIN_CALLS", "4"))
+BREAKER_FAILURE_RATIO = float(os.getenv("BREAKER_FAILURE_RATIO", "0.5"))
+BREAKER_OPEN_SECONDS = float(os.getenv("BREAKER_OPEN_SECONDS", "30"))
+
+# Menu cache (seconds)
+MENU_CACHE_TTL = float(os.getenv("MENU_CACHE_TTL", "300"))
+MENU_REFRESH_INTERVAL = float(os.getenv("MENU_REFRESH_INTERVAL", "240"))
+# Menu versions kept so buttons on older carousels still resolve
+MENU_HISTORY_SIZE = int(os.getenv("MENU_HISTORY_SIZE", "8"))
+# File for a menu snapshot shared by several workers (empty: each worker fetches its own)
+SHARED_MENU_PATH = os.getenv("SHARED_MENU_PATH", "")
+SHARED_MENU_POLL_INTERVAL = float(os.getenv("SHARED_MENU_POLL_INTERVAL", "1"))
+# Last good tap list, rewritten on every refresh and served on boot until the first refresh
+MENU_SNAPSHOT_PATH = os.getenv("MENU_SNAPSHOT_PATH", "/tmp/titansbeers-menu.snapshot")
+
+# Beers per carousel page (Line allows 12 bubbles; one is the "More beers" bubble)
+BEER_PAGE_SIZE = int(os.getenv("BEER_PAGE_SIZE", "11"))
+# Rendered beer carousel pages kept across menu versions (a version's pages are never evicted while it is rendered)
+CAROUSEL_CACHE_MAX_ENTRIES = int(os.getenv("CAROUSEL_CACHE_MAX_ENTRIES", "64"))
+
+# Saved beers per "my beers" page (one more bubble is used for "Show older")
+SAVED_BEERS_PAGE_SIZE = int(os.getenv("SAVED_BEERS_PAGE_SIZE", "10"))
+
+# Per-user cache of rendered "my beers" pages
+SAVED_BEERS_CACHE_MAX_ENTRIES = int(os.getenv("SAVED_BEERS_CACHE_MAX_ENTRIES", "1000"))
+SAVED_BEERS_CACHE_MAX_BYTES = int(os.getenv("SAVED_BEERS_CACHE_MAX_BYTES", str(8 * 1024 * 1024)))
+SAVED_BEERS_CACHE_TTL = float(os.getenv("SAVED_BEERS_CACHE_TTL", "300"))
+
+# Beers in a "recommend" carousel, picked using the user's latest saved beers
+RECOMMEND_COUNT = int(os.getenv("RECOMMEND_COUNT", "5"))
+# Most saved beers read (newest first) to build the profile and leave out beers already saved
+RECOMMEND_MAX_SAVED = int(os.getenv("RECOMMEND_MAX_SAVED", "500"))
+# Users whose saved beers "recommend" keeps in memory between recommendations
+RECOMMEND_CACHE_MAX_ENTRIES = int(os.getenv("RECOMMEND_CACHE_MAX_ENTRIES", "200"))
+
+# Write-behind batching of save/delete postbacks
+WRITE_BEHIND_INTERVAL = float(os.getenv("WRITE_BEHIND_INTERVAL", "2"))
+WRITE_BEHIND_BATCH_SIZE = int(os.getenv("WRITE_BEHIND_BATCH_SIZE", "50"))
+WRITE_BEHIND_SPOOL_PATH = os.getenv("WRITE_BEHIND_SPOOL_PATH", "/tmp/titansbeers-write-behind.json")
+
+# Webhook events handled concurrently, and queued before new events are dropped
+EVENT_CONCURRENCY = int(os.getenv("EVENT_CONCURRENCY", "16"))
+EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", "1000"))
+# Seconds after an event that its reply token is still used (Line expires them after about a minute)
+REPLY_TOKEN_TTL = float(os.getenv("REPLY_TOKEN_TTL", "50"))
+# Seconds shutdown waits for queued events, leaving time to flush writes before the platform kills the process
+EVENT_DRAIN_TIMEOUT = float(os.getenv("EVENT_DRAIN_TIMEOUT", "5"))
+# Webhook event IDs remembered to skip redelivered events (seconds, count)
+EVENT_DEDUP_WINDOW = float(os.getenv("EVENT_DEDUP_WINDOW", "3600"))
+EVENT_DEDUP_MAX_ENTRIES = int(os.getenv("EVENT_DEDUP_MAX_ENTRIES", "20000"))
+
+# Seconds between mtime checks of app/data/*.json
+STATIC_RELOAD_INTERVAL = float(os.getenv("STATIC_RELOAD_INTERVAL", "30"))
+
+# Logging: level, and the fraction of webhooks whose (redacted) payload is logged
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+WEBHOOK_LOG_SAMPLE_RATE = float(os.getenv("WEBHOOK_LOG_SAMPLE_RATE", "0"))
+
 # Untappd Configuration
 UNTAPPD_VENUE_URL = "https://untappd.com/v/titans-craft-beer-bar-and-bottle-shop/5286704"
 
@@ -32,3 +111,4 @@ HAGEHIGE_TRIGGERS = ["hagehige"]
 YURIE_TRIGGERS = ["yurie", "ゆりえ", "ユリエ"]
 ADAM_TRIGGERS = ["adam", "アダム"]
 MY_BEERS_TRIGGERS = ["my beers", "mybeers", "my list", "saved", "マイビール"]
+RECOMMEND_TRIGGERS = ["recommend", "recommendations", "おすすめ", "オススメ"]
@@ -0,0 +1,180 @@
+import asyncio
+import contextvars
+import heapq
+import itertools
+import logging
+import time
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Set, Tuple
+
+from .config import (
+    EVENT_CONCURRENCY,
+    EVENT_QUEUE_SIZE,
+    EVENT_DRAIN_TIMEOUT,
+    REPLY_TOKEN_TTL,
+    EVENT_DEDUP_WINDOW,
+    EVENT_DEDUP_MAX_ENTRIES,
+)
+from .metrics import event_queue_delay
+
+logger = logging.getLogger(__name__)
+
+# (event, reply deadline on the monotonic clock, time it was queued, context of the webhook request)
+Queued = Tuple[Dict[str, Any], float, float, contextvars.Context]
+EventHandler = Callable[[Dict[str, Any], float], Awaitable[None]]
+
+
+def ordering_key(event: Dict[str, Any]) -> str:
+    """Events with the same key run one at a time, in delivery order."""
+    source = event.get("source", {})
+    return (
+        source.get("userId")
+        or source.get("groupId")
+        or source.get("roomId")
+        or event.get("webhookEventId")
+        or event.get("replyToken", "")
+    )
+
+
+def reply_deadline(event: Dict[str, Any], token_ttl: float = REPLY_TOKEN_TTL) -> float:
+    """When the event's reply token expires, on the monotonic clock."""
+    timestamp = event.get("timestamp")
+    waited = max(0.0, time.time() - timestamp / 1000) if timestamp else 0.0
+    return time.monotonic() + token_ttl - waited
+
+
+class RecentEventIds:
+    """
+    Webhook event IDs accepted in the last `window` seconds, so that events
+    Line redelivers are recognised. Holds at most `max_entries` IDs, stored
+    as hashes (a collision would need billions of events in one window).
+    """
+
+    def __init__(self, window: float = EVENT_DEDUP_WINDOW, max_entries: int = EVENT_DEDUP_MAX_ENTRIES):
+        self.window = window
+        self.max_entries = max_entries
+        self._seen: "OrderedDict[int, float]" = OrderedDict()
+
+    def _expire(self, now: float) -> None:
+        while self._seen:
+            oldest = next(iter(self._seen.values()))
+            if now - oldest <= self.window and len(self._seen) <= self.max_entries:
+                break
+            self._seen.popitem(last=False)
+
+    def seen(self, event_id: str) -> bool:
+        self._expire(time.monotonic())
+        return hash(event_id) in self._seen
+
+    def add(self, event_id: str) -> None:
+        self._seen[hash(event_id)] = time.monotonic()
+        self._expire(time.monotonic())
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+
+class EventScheduler:
+    """
+    Runs webhook events concurrently, so the webhook can be acknowledged at once.
+    At most `concurrency` events run at a time, earliest reply deadline first.
+    Events from one user run in order and never in parallel, so a burst from
+    one chat occupies a single slot instead of holding up everyone else.
+    """
+
+    def __init__(
+        self,
+        handler: EventHandler,
+        concurrency: int = EVENT_CONCURRENCY,
+        max_pending: int = EVENT_QUEUE_SIZE,
+        token_ttl: float = REPLY_TOKEN_TTL,
+    ):
+        self.handler = handler
+        self.concurrency = concurrency
+        self.max_pending = max_pending
+        self.token_ttl = token_ttl
+        self._queues: Dict[str, Deque[Queued]] = {}
+        # (deadline, sequence, key) of each idle user's next event
+        self._ready: List[Tuple[float, int, str]] = []
+        self._running: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self._sequence = itertools.count()
+        self._pending = 0
+        self._closing = False
+        self.submitted = 0
+        self.rejected = 0
+        self.failures = 0
+
+    def submit(self, event: Dict[str, Any]) -> bool:
+        """Queue an event; returns False if the queue is full (or closed) and the event was dropped."""
+        if self._pending >= self.max_pending or self._closing:
+            self.rejected += 1
+            logger.warning("Event queue full (%d pending); dropping a %s event", self._pending, event.get("type"))
+            return False
+
+        key = ordering_key(event)
+        deadline = reply_deadline(event, self.token_ttl)
+        queue = self._queues.setdefault(key, deque())
+        # Keep the submitting request's context (request ID), whichever task dispatches the event
+        queue.append((event, deadline, time.monotonic(), contextvars.copy_context()))
+        self._pending += 1
+        self.submitted += 1
+        if len(queue) == 1 and key not in self._running:
+            heapq.heappush(self._ready, (deadline, next(self._sequence), key))
+        self._dispatch()
+        return True
+
+    def pending_count(self) -> int:
+        return self._pending
+
+    def _dispatch(self) -> None:
+        # Once close() has given up on the queue, finishing tasks must not start new ones
+        while self._ready and len(self._running) < self.concurrency and not self._closing:
+            _, _, key = heapq.heappop(self._ready)
+            event, deadline, queued_at, context = self._queues[key].popleft()
+            self._pending -= 1
+            self._running.add(key)
+            event_queue_delay.observe(time.monotonic() - queued_at)
+            task = asyncio.create_task(self._run(key, event, deadline), context=context)
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, key: str, event: Dict[str, Any], deadline: float) -> None:
+        try:
+            await self.handler(event, deadline)
+        except Exception as e:
+            self.failures += 1
+            logger.exception("Error handling %s event: %s", event.get("type"), e)
+        finally:
+            self._running.discard(key)
+            queue = self._queues.get(key)
+            if queue:
+                heapq.heappush(self._ready, (queue[0][1], next(self._sequence), key))
+            else:
+                self._queues.pop(key, None)
+            self._dispatch()
+
+    async def close(self, timeout: float = EVENT_DRAIN_TIMEOUT) -> None:
+        """Wait for queued and running events (up to `timeout` seconds), then cancel the rest."""
+        deadline = time.monotonic() + timeout
+        while self._tasks and time.monotonic() < deadline:
+            await asyncio.wait(set(self._tasks), timeout=deadline - time.monotonic())
+        if self._tasks or self._pending:
+            logger.warning("Abandoning %d running and %d queued events", len(self._tasks), self._pending)
+        self._closing = True
+        self._queues.clear()
+        self._ready.clear()
+        self._pending = 0
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "concurrency": self.concurrency,
+            "running": len(self._running),
+            "pending": self._pending,
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+            "failures": self.failures,
+        }
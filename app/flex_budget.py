@@ -0,0 +1,142 @@
+import copy
+import logging
+from typing import Any, Dict, List, Sequence, Tuple, Union
+
+from . import json_codec
+from .flex_messages import Message
+from .metrics import reply_adjustments, reply_message_count, reply_size_ratio
+
+logger = logging.getLogger(__name__)
+
+# Line Messaging API limits
+MAX_MESSAGES_PER_REPLY = 5
+MAX_FLEX_BYTES = 50_000
+MAX_BUBBLE_BYTES = 30_000
+MAX_CAROUSEL_BUBBLES = 12
+MAX_TEXT_CHARS = 5000
+MAX_ALT_TEXT_CHARS = 1500
+
+# Bubble text longer than this is cut first when a bubble is over budget
+TRIMMED_TEXT_CHARS = 100
+
+# Handlers may reply with one message or several
+Reply = Union[Message, Sequence[Message]]
+
+# Bytes a carousel adds around its bubbles, plus one comma per bubble
+_CAROUSEL_OVERHEAD = 200
+
+
+def _truncate(text: str, limit: int) -> str:
+    return text if len(text) <= limit else text[: limit - 3] + "..."
+
+
+def _trim_texts(node: Any) -> None:
+    """Shorten long text components in place."""
+    if isinstance(node, dict):
+        if node.get("type") == "text" and len(node.get("text", "")) > TRIMMED_TEXT_CHARS:
+            node["text"] = _truncate(node["text"], TRIMMED_TEXT_CHARS)
+        for value in node.values():
+            _trim_texts(value)
+    elif isinstance(node, list):
+        for value in node:
+            _trim_texts(value)
+
+
+def fit_bubble(bubble: Dict[str, Any]) -> Tuple[Dict[str, Any], bytes]:
+    """
+    Return the bubble (trimmed if needed) and its serialized size in bytes.
+    Long texts are shortened first, then the hero image is dropped.
+    Returns an empty dict if the bubble cannot be made to fit.
+    """
+    encoded = json_codec.dumps(bubble)
+    if len(encoded) <= MAX_BUBBLE_BYTES:
+        return bubble, encoded
+
+    trimmed = copy.deepcopy(bubble)
+    _trim_texts(trimmed)
+    encoded = json_codec.dumps(trimmed)
+    if len(encoded) > MAX_BUBBLE_BYTES and "hero" in trimmed:
+        del trimmed["hero"]
+        encoded = json_codec.dumps(trimmed)
+    if len(encoded) > MAX_BUBBLE_BYTES:
+        reply_adjustments.inc("drop_bubble")
+        logger.warning("Dropped a %d-byte bubble over the %d-byte limit", len(encoded), MAX_BUBBLE_BYTES)
+        return {}, b""
+    reply_adjustments.inc("trim_bubble")
+    return trimmed, encoded
+
+
+def split_carousel(message: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Split an oversized carousel into carousels that each fit the flex limits."""
+    chunks: List[List[Dict[str, Any]]] = [[]]
+    chunk_bytes = _CAROUSEL_OVERHEAD + len(message.get("altText", "").encode("utf-8"))
+    base_bytes = chunk_bytes
+    for bubble in message["contents"]["contents"]:
+        bubble, encoded = fit_bubble(bubble)
+        if not bubble:
+            continue
+        size = len(encoded) + 1
+        if chunks[-1] and (chunk_bytes + size > MAX_FLEX_BYTES or len(chunks[-1]) >= MAX_CAROUSEL_BUBBLES):
+            chunks.append([])
+            chunk_bytes = base_bytes
+        chunks[-1].append(bubble)
+        chunk_bytes += size
+
+    if len(chunks) > 1:
+        reply_adjustments.inc("split_carousel")
+    return [
+        {**message, "contents": {**message["contents"], "contents": bubbles}}
+        for bubbles in chunks if bubbles
+    ]
+
+
+def fit_message(message: Dict[str, Any]) -> List[bytes]:
+    """Serialize a message, trimming or splitting it into messages within Line's limits."""
+    if message.get("type") == "text" and len(message.get("text", "")) > MAX_TEXT_CHARS:
+        reply_adjustments.inc("truncate_text")
+        message = {**message, "text": _truncate(message["text"], MAX_TEXT_CHARS)}
+
+    if message.get("type") != "flex":
+        return [json_codec.dumps(message)]
+
+    if len(message.get("altText", "")) > MAX_ALT_TEXT_CHARS:
+        message = {**message, "altText": _truncate(message["altText"], MAX_ALT_TEXT_CHARS)}
+
+    encoded = json_codec.dumps(message)
+    contents = message.get("contents", {})
+    if contents.get("type") == "carousel":
+        if len(encoded) <= MAX_FLEX_BYTES and len(contents.get("contents", [])) <= MAX_CAROUSEL_BUBBLES:
+            return [encoded]
+        return [json_codec.dumps(part) for part in split_carousel(message)]
+
+    if len(encoded) <= MAX_FLEX_BYTES:
+        return [encoded]
+    bubble, _ = fit_bubble(contents)
+    return [json_codec.dumps({**message, "contents": bubble})] if bubble else []
+
+
+def fit_reply(reply: Reply) -> List[bytes]:
+    """
+    Serialize a reply into at most five messages that each fit Line's limits.
+    Pre-serialized messages within the limit are passed through untouched;
+    how close the reply came to the limits is recorded in /metrics.
+    """
+    messages = [reply] if isinstance(reply, (dict, bytes)) else list(reply)
+    fitted: List[bytes] = []
+    for message in messages:
+        if isinstance(message, bytes):
+            if len(message) <= MAX_FLEX_BYTES:
+                fitted.append(message)
+                continue
+            message = json_codec.loads(message)
+        fitted.extend(fit_message(message))
+
+    if len(fitted) > MAX_MESSAGES_PER_REPLY:
+        reply_adjustments.inc("drop_message", amount=len(fitted) - MAX_MESSAGES_PER_REPLY)
+        logger.warning("Reply had %d messages; sending the first %d", len(fitted), MAX_MESSAGES_PER_REPLY)
+        fitted = fitted[:MAX_MESSAGES_PER_REPLY]
+
+    if fitted:
+        reply_size_ratio.observe(max(len(message) for message in fitted) / MAX_FLEX_BYTES)
+        reply_message_count.observe(len(fitted))
+    return fitted
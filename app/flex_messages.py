@@ -1,13 +1,32 @@
 import json
+import logging
 import os
-from typing import List, Dict, Any
-from .scraper import trim_string
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Union, Tuple
+from . import json_codec
+from .config import BEER_PAGE_SIZE, CAROUSEL_CACHE_MAX_ENTRIES
+from .metrics import render_duration
+from .models import Beer, DEFAULT_CHECK_IN_URL
+
+logger = logging.getLogger(__name__)
 
 DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
 
 # Titans logo URL
 TITANS_LOGO = "https://obs.line-scdn.net/0hMJn8lgocEmVTQQaKOTRtMgMcGQdgIwxucXUGAnQ-KQg4IyxMJltfYDI9Ogw4CgpPZ3cCc3c6EzV2Ix1Yb0Y4d3U-NSohGlZYN3cWdDcqByUiITAzKA/f256x256"
 
+# A message is either a dict or its pre-serialized JSON bytes
+Message = Union[Dict[str, Any], bytes]
+
+# Rendered beer carousel pages keyed by (menu version, page)
+_carousel_cache: "OrderedDict[Tuple[str, int], bytes]" = OrderedDict()
+_carousel_stats = {"hits": 0, "misses": 0}
+
+# Rendered menu search results keyed by (menu version, normalized query)
+SEARCH_CACHE_SIZE = 64
+_search_cache: "OrderedDict[Tuple[str, Tuple], bytes]" = OrderedDict()
+_search_stats = {"hits": 0, "misses": 0}
+
 
 def load_json_data(filename: str) -> Any:
     """Load JSON data from the data directory."""
@@ -16,122 +35,174 @@ def load_json_data(filename: str) -> Any:
         with open(filepath, "r", encoding="utf-8") as f:
             return json.load(f)
     except (FileNotFoundError, json.JSONDecodeError) as e:
-        print(f"Error loading {filename}: {e}")
+        logger.error("Error loading %s: %s", filename, e)
         return None
 
 
-def build_beer_carousel(beers: List[Dict[str, str]]) -> Dict[str, Any]:
-    """Build a Flex Message carousel for beers."""
-    bubbles = []
+# Menu buttons carry "<code>:<menu version>:<number>" instead of the beer itself;
+# the handler resolves it against a retained menu snapshot
+POSTBACK_CODES = {"s": "save_beer", "p": "beer_page"}
+POSTBACK_FIELDS = {"save_beer": "index", "beer_page": "page"}
 
-    for beer in beers:
-        # Create postback data for saving beer
-        save_data = json.dumps({
-            "action": "save_beer",
-            "name": beer.get("name", ""),
-            "brewery": beer.get("brewery", ""),
-            "style": beer.get("style", ""),
-            "abv": beer.get("abv", ""),
-            "rating": beer.get("rating", ""),
-            "label": beer.get("label", ""),
-        })
 
-        bubble = {
-            "type": "bubble",
-            "size": "kilo",
-            "hero": {
-                "type": "image",
-                "url": beer.get("label", ""),
-                "size": "full",
-                "aspectMode": "cover",
-            },
-            "body": {
-                "type": "box",
-                "layout": "vertical",
-                "contents": [
-                    {
-                        "type": "text",
-                        "text": trim_string(beer.get("name", "Unknown")),
-                        "weight": "bold",
-                        "size": "lg",
-                        "wrap": True,
-                    },
-                    {
-                        "type": "box",
-                        "layout": "vertical",
-                        "contents": [
-                            {
-                                "type": "box",
-                                "layout": "baseline",
-                                "spacing": "sm",
-                                "contents": [
-                                    {
-                                        "type": "text",
-                                        "text": beer.get("brewery", ""),
-                                        "wrap": True,
-                                        "color": "#8c8c8c",
-                                        "size": "md",
-                                        "flex": 5,
-                                    }
-                                ],
-                            }
-                        ],
-                    },
-                    {
-                        "type": "text",
-                        "text": beer.get("style", ""),
-                        "size": "md",
-                    },
-                    {
-                        "type": "text",
-                        "text": f"ABV: {beer.get('abv', '')}",
-                        "size": "xs",
-                    },
-                    {
-                        "type": "text",
-                        "text": f"Rating: {beer.get('rating', '')}",
-                        "color": "#8c8c8c",
-                        "size": "xs",
+def menu_postback(action: str, version: str, number: int) -> str:
+    """Compact postback data referring to a beer index or page of a menu version."""
+    code = "s" if action == "save_beer" else "p"
+    return f"{code}:{version}:{number}"
+
+
+def delete_postback(beer_id: Any) -> str:
+    """Compact postback data for a saved beer's Delete button: `d:<id>`."""
+    return f"d:{beer_id}"
+
+
+def decode_postback(data: str) -> Optional[Dict[str, Any]]:
+    """
+    Decode postback data into a dict with an "action".
+    Accepts compact menu and delete tokens, and JSON ("Show older" buttons, and
+    carousels sent before tokens were introduced). Returns None if it can't be decoded.
+    """
+    if data.startswith("{"):
+        try:
+            decoded = json_codec.loads(data)
+        except ValueError:
+            return None
+        return decoded if isinstance(decoded, dict) else None
+
+    code, _, rest = data.partition(":")
+    if code == "d":
+        if not rest:
+            return None
+        # Database ids are numbers; unflushed saves have a placeholder string id
+        return {"action": "delete_beer", "id": int(rest) if rest.isdigit() else rest}
+
+    version, _, number = rest.partition(":")
+    action = POSTBACK_CODES.get(code)
+    if action is None or not version or not number.isdigit():
+        return None
+    return {"action": action, "v": version, POSTBACK_FIELDS[action]: int(number)}
+
+
+def page_count(beers: List[Beer]) -> int:
+    """Number of carousel pages needed for the tap list."""
+    return max(1, -(-len(beers) // BEER_PAGE_SIZE))
+
+
+def build_beer_bubble(beer: Beer, index: int, version: str) -> Dict[str, Any]:
+    """Build the bubble for one beer; its Save button refers to `index` in menu `version`."""
+    save_data = menu_postback("save_beer", version, index)
+
+    return {
+        "type": "bubble",
+        "size": "kilo",
+        "hero": {
+            "type": "image",
+            "url": beer.label,
+            "size": "full",
+            "aspectMode": "cover",
+        },
+        "body": {
+            "type": "box",
+            "layout": "vertical",
+            "contents": [
+                {
+                    "type": "text",
+                    "text": beer.title,
+                    "weight": "bold",
+                    "size": "lg",
+                    "wrap": True,
+                },
+                {
+                    "type": "box",
+                    "layout": "vertical",
+                    "contents": [
+                        {
+                            "type": "box",
+                            "layout": "baseline",
+                            "spacing": "sm",
+                            "contents": [
+                                {
+                                    "type": "text",
+                                    "text": beer.brewery,
+                                    "wrap": True,
+                                    "color": "#8c8c8c",
+                                    "size": "md",
+                                    "flex": 5,
+                                }
+                            ],
+                        }
+                    ],
+                },
+                {
+                    "type": "text",
+                    "text": beer.style,
+                    "size": "md",
+                },
+                {
+                    "type": "text",
+                    "text": f"ABV: {beer.abv}",
+                    "size": "xs",
+                },
+                {
+                    "type": "text",
+                    "text": f"Rating: {beer.rating}",
+                    "color": "#8c8c8c",
+                    "size": "xs",
+                },
+                {
+                    "type": "button",
+                    "action": {
+                        "type": "uri",
+                        "label": "Check-in on Untappd",
+                        "uri": beer.check_in or DEFAULT_CHECK_IN_URL,
                     },
-                    {
-                        "type": "button",
-                        "action": {
-                            "type": "uri",
-                            "label": "Check-in on Untappd",
-                            "uri": beer.get("check_in", "https://untappd.com"),
-                        },
-                        "gravity": "bottom",
-                        "height": "sm",
-                        "margin": "md",
+                    "gravity": "bottom",
+                    "height": "sm",
+                    "margin": "md",
+                },
+            ],
+            "spacing": "none",
+            "paddingAll": "13px",
+        },
+        "footer": {
+            "type": "box",
+            "layout": "vertical",
+            "contents": [
+                {
+                    "type": "button",
+                    "action": {
+                        "type": "postback",
+                        "label": "⭐ Save to My List",
+                        "data": save_data,
+                        "displayText": f"Saving {beer.short_title}...",
                     },
-                ],
-                "spacing": "none",
-                "paddingAll": "13px",
-            },
-            "footer": {
-                "type": "box",
-                "layout": "vertical",
-                "contents": [
-                    {
-                        "type": "button",
-                        "action": {
-                            "type": "postback",
-                            "label": "⭐ Save to My List",
-                            "data": save_data,
-                            "displayText": f"Saving {trim_string(beer.get('name', ''), 20)}...",
-                        },
-                        "style": "primary",
-                        "color": "#FFC107",
-                        "height": "sm",
-                    }
-                ],
-            },
-            "styles": {
-                "header": {"separator": False},
-                "footer": {"separator": True},
-            },
-        }
-        bubbles.append(bubble)
+                    "style": "primary",
+                    "color": "#FFC107",
+                    "height": "sm",
+                }
+            ],
+        },
+        "styles": {
+            "header": {"separator": False},
+            "footer": {"separator": True},
+        },
+    }
+
+
+def build_beer_carousel(beers: List[Beer], page: int = 0, version: str = "") -> Dict[str, Any]:
+    """
+    Build a Flex Message carousel for one page of beers.
+    Pages other than the last end with a "More beers" bubble whose postback
+    asks for the next page of the same menu version. Save buttons refer to
+    the beer by its index in that version.
+    """
+    start = page * BEER_PAGE_SIZE
+    end = start + BEER_PAGE_SIZE
+    bubbles = [build_beer_bubble(beer, index, version) for index, beer in enumerate(beers[start:end], start)]
+
+    remaining = len(beers) - end
+    if remaining > 0:
+        bubbles.append(build_more_beers_bubble(page + 1, version, remaining))
 
     return {
         "type": "flex",
@@ -140,6 +211,132 @@ def build_beer_carousel(beers: List[Dict[str, str]]) -> Dict[str, Any]:
     }
 
 
+def build_search_carousel(
+    beers: List[Beer], indices: List[int], version: str, alt_text: Optional[str] = None
+) -> Dict[str, Any]:
+    """Build a carousel of the first page of search results (indices into the menu)."""
+    bubbles = [build_beer_bubble(beers[index], index, version) for index in indices[:BEER_PAGE_SIZE]]
+    return {
+        "type": "flex",
+        "altText": alt_text or f"🍺 {len(indices)} matching beer{'s' if len(indices) != 1 else ''} on tap",
+        "contents": {"type": "carousel", "contents": bubbles},
+    }
+
+
+def build_more_beers_bubble(next_page: int, version: str, remaining: int) -> Dict[str, Any]:
+    """Build the trailing bubble that requests the next carousel page."""
+    page_data = menu_postback("beer_page", version, next_page)
+
+    return {
+        "type": "bubble",
+        "size": "kilo",
+        "body": {
+            "type": "box",
+            "layout": "vertical",
+            "contents": [
+                {"type": "image", "url": TITANS_LOGO, "size": "xs"},
+                {
+                    "type": "text",
+                    "text": f"{remaining} more on tap",
+                    "weight": "bold",
+                    "size": "lg",
+                    "margin": "md",
+                    "align": "center",
+                },
+            ],
+            "justifyContent": "center",
+            "paddingAll": "13px",
+        },
+        "footer": {
+            "type": "box",
+            "layout": "vertical",
+            "contents": [
+                {
+                    "type": "button",
+                    "action": {
+                        "type": "postback",
+                        "label": "More beers →",
+                        "data": page_data,
+                        "displayText": "More beers →",
+                    },
+                    "style": "primary",
+                    "color": "#FFC107",
+                    "height": "sm",
+                }
+            ],
+        },
+    }
+
+
+def serialize_message(message: Message) -> bytes:
+    """Serialize a message to compact JSON bytes (bytes pass through)."""
+    if isinstance(message, bytes):
+        return message
+    return json_codec.dumps(message)
+
+
+def render_beer_carousel(beers: List[Beer], version: str, page: int = 0) -> bytes:
+    """
+    Return one beer carousel page as JSON bytes, cached under the menu version.
+    Pages are rendered lazily and only rebuilt when the menu contents change.
+    """
+    key = (version, page)
+    rendered = _carousel_cache.get(key)
+    if rendered is None:
+        _carousel_stats["misses"] += 1
+        with render_duration.time("beer_carousel"):
+            rendered = serialize_message(build_beer_carousel(beers, page, version))
+        _carousel_cache[key] = rendered
+        _evict_carousels(version)
+    else:
+        _carousel_cache.move_to_end(key)
+        _carousel_stats["hits"] += 1
+    return rendered
+
+
+def _evict_carousels(version: str) -> None:
+    """Drop least recently used pages of other menu versions until the cache fits."""
+    while len(_carousel_cache) > CAROUSEL_CACHE_MAX_ENTRIES:
+        # The version being rendered stays whole, however many pages it has
+        old_key = next((key for key in _carousel_cache if key[0] != version), None)
+        if old_key is None:
+            break
+        del _carousel_cache[old_key]
+
+
+def prerender_beer_carousels(beers: List[Beer], version: str) -> None:
+    """Render every page of a menu version ahead of the first request for it."""
+    for page in range(page_count(beers)):
+        render_beer_carousel(beers, version, page)
+
+
+def carousel_cache_stats() -> Dict[str, Any]:
+    """Hit/miss counters of the rendered carousel cache."""
+    return {"entries": len(_carousel_cache), **_carousel_stats}
+
+
+def render_search_carousel(beers: List[Beer], version: str, indices: List[int], query_key: Tuple) -> bytes:
+    """Return a search result carousel as JSON bytes, cached per menu version and query."""
+    key = (version, query_key)
+    rendered = _search_cache.get(key)
+    if rendered is None:
+        _search_stats["misses"] += 1
+        with render_duration.time("search_carousel"):
+            rendered = serialize_message(build_search_carousel(beers, indices, version))
+        _search_cache[key] = rendered
+        while len(_search_cache) > SEARCH_CACHE_SIZE:
+            _search_cache.popitem(last=False)
+    else:
+        _search_cache.move_to_end(key)
+        _search_stats["hits"] += 1
+    return rendered
+
+
+def search_cache_stats() -> Dict[str, Any]:
+    """Hit/miss counters of the rendered search result cache."""
+    return {"entries": len(_search_cache), **_search_stats}
+
+
 def build_size_message() -> Dict[str, Any]:
     """Build the drink size Flex Message."""
     size_data = load_json_data("size_images.json")
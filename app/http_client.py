@@ -0,0 +1,127 @@
+import time
+from typing import Optional
+
+import httpx
+
+from .circuit_breaker import CircuitOpenError, scraper_breaker
+from .config import (
+    SCRAPER_API_URL,
+    HTTP_CONNECT_TIMEOUT,
+    SCRAPER_API_TIMEOUT,
+    LINE_API_TIMEOUT,
+    SCRAPER_POOL_SIZE,
+    LINE_POOL_SIZE,
+)
+from .metrics import upstream_duration, upstream_errors
+
+# Long-lived keep-alive pools, created lazily on first use and closed on shutdown
+_scraper_client: Optional[httpx.AsyncClient] = None
+_line_client: Optional[httpx.AsyncClient] = None
+
+
+def endpoint_timeout(seconds: float) -> httpx.Timeout:
+    """Build a per-endpoint timeout with the shared connect timeout."""
+    return httpx.Timeout(seconds, connect=min(HTTP_CONNECT_TIMEOUT, seconds))
+
+
+def get_scraper_client() -> httpx.AsyncClient:
+    """Return the pooled client for the Oracle Cloud scraper API."""
+    global _scraper_client
+    if _scraper_client is None or _scraper_client.is_closed:
+        _scraper_client = httpx.AsyncClient(
+            base_url=SCRAPER_API_URL,
+            timeout=endpoint_timeout(SCRAPER_API_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=SCRAPER_POOL_SIZE,
+                max_keepalive_connections=SCRAPER_POOL_SIZE,
+            ),
+        )
+    return _scraper_client
+
+
+def error_reason(error: BaseException) -> str:
+    """Short, low-cardinality label for a failed upstream call."""
+    if isinstance(error, httpx.TimeoutException):
+        return "timeout"
+    if isinstance(error, httpx.HTTPStatusError):
+        return f"http_{error.response.status_code // 100}xx"
+    if isinstance(error, CircuitOpenError):
+        return "circuit_open"
+    return type(error).__name__
+
+
+def get_line_client() -> httpx.AsyncClient:
+    """Return the pooled client for the Line Messaging API."""
+    global _line_client
+    if _line_client is None or _line_client.is_closed:
+        _line_client = httpx.AsyncClient(
+            timeout=endpoint_timeout(LINE_API_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=LINE_POOL_SIZE,
+                max_keepalive_connections=LINE_POOL_SIZE,
+            ),
+        )
+    return _line_client
+
+
+async def scraper_request(
+    method: str,
+    path: str,
+    timeout: Optional[float] = None,
+    **kwargs,
+) -> httpx.Response:
+    """
+    Send a request to the scraper API and raise on HTTP errors.
+    `timeout` overrides the default scraper API timeout for this endpoint.
+    A 304 Not Modified is returned as-is for conditional requests.
+    Raises CircuitOpenError without calling the API while the breaker is open.
+    """
+    if timeout is not None:
+        kwargs["timeout"] = endpoint_timeout(timeout)
+
+    # "/mybeers/<user_id>" is labelled "/mybeers" to keep metric cardinality fixed
+    endpoint = "/" + path.lstrip("/").split("/", 1)[0]
+    try:
+        scraper_breaker.before_call()
+    except CircuitOpenError as e:
+        upstream_errors.inc("scraper", endpoint, error_reason(e))
+        raise
+
+    start = time.perf_counter()
+    try:
+        response = await get_scraper_client().request(method, path, **kwargs)
+    except httpx.HTTPError as e:
+        scraper_breaker.record_failure()
+        upstream_errors.inc("scraper", endpoint, error_reason(e))
+        raise
+    except BaseException:
+        scraper_breaker.release()
+        raise
+    finally:
+        upstream_duration.observe(time.perf_counter() - start, "scraper", endpoint)
+
+    # Client errors mean the VM is up, so only 5xx counts against the breaker
+    if response.status_code >= 500:
+        scraper_breaker.record_failure()
+    else:
+        scraper_breaker.record_success()
+    if response.status_code != 304 and not response.is_success:
+        upstream_errors.inc("scraper", endpoint, f"http_{response.status_code // 100}xx")
+        response.raise_for_status()
+    return response
+
+
+def open_clients() -> None:
+    """Create the pooled clients (and their TLS contexts) ahead of the first request."""
+    get_scraper_client()
+    get_line_client()
+
+
+async def close_clients() -> None:
+    """Close the pooled clients (called on app shutdown)."""
+    global _scraper_client, _line_client
+    for client in (_scraper_client, _line_client):
+        if client is not None and not client.is_closed:
+            await client.aclose()
+    _scraper_client = None
+    _line_client = None
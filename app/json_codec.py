@@ -0,0 +1,26 @@
+import json
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the deployment
+    orjson = None
+
+# Which implementation is in use, reported by /status
+BACKEND = "orjson" if orjson is not None else "json"
+
+
+def loads(data: Union[bytes, memoryview, str]) -> Any:
+    """Decode JSON from bytes, a buffer or text. Raises ValueError on invalid input."""
+    if orjson is not None:
+        return orjson.loads(data)
+    if isinstance(data, memoryview):
+        data = data.tobytes()
+    return json.loads(data)
+
+
+def dumps(obj: Any) -> bytes:
+    """Encode to compact UTF-8 JSON bytes (non-ASCII characters are not escaped)."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
@@ -1,11 +1,19 @@
 import hashlib
 import hmac
 import base64
-from typing import Optional, Dict, Any
-import requests
+import json
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Set, Tuple
+import httpx
 
 from .config import (
     LINE_CHANNEL_ACCESS_TOKEN,
+    LINE_REPLY_URL,
+    LINE_PUSH_URL,
+    LINE_PUSH_FALLBACK,
     LINE_CHANNEL_SECRET,
     BEER_TRIGGERS,
     SIZE_TRIGGERS,
@@ -14,19 +22,82 @@ from .config import (
     YURIE_TRIGGERS,
     ADAM_TRIGGERS,
     MY_BEERS_TRIGGERS,
+    RECOMMEND_TRIGGERS,
+    RECOMMEND_COUNT,
+    RECOMMEND_MAX_SAVED,
+    RECOMMEND_CACHE_MAX_ENTRIES,
+    SAVED_BEERS_PAGE_SIZE,
+    BEER_PAGE_SIZE,
+    SAVED_BEERS_CACHE_MAX_ENTRIES,
+    SAVED_BEERS_CACHE_MAX_BYTES,
+    SAVED_BEERS_CACHE_TTL,
 )
-from .scraper import scrape_beers
+from . import json_codec
+from .event_scheduler import EventScheduler, RecentEventIds
+from .http_client import error_reason, get_line_client, scraper_request
+from .scraper import menu_cache
+from .flex_budget import Reply, fit_reply
 from .flex_messages import (
-    build_beer_carousel,
-    build_size_message,
-    build_staff_carousel,
-    build_hagehige_carousel,
-    build_personal_message,
+    Message,
+    build_search_carousel,
+    decode_postback,
+    delete_postback,
+    page_count,
+    render_beer_carousel,
+    render_search_carousel,
+    serialize_message,
 )
-
-
-LINE_REPLY_URL = "https://api.line.me/v2/bot/message/reply"
-SCRAPER_API_URL = "http://140.238.197.186:5000"
+from .logging_setup import redact_payload, redact_user, should_sample
+from .metrics import (
+    duplicate_events,
+    events_in_flight,
+    expired_replies,
+    handler_duration,
+    render_duration,
+    upstream_duration,
+    upstream_errors,
+    webhook_events,
+)
+from .menu_search import MenuQuery, menu_index
+from .models import Beer, decode_saved, trim_string
+from .recommend import menu_features
+from .static_messages import static_messages
+from .write_behind import DELETE_NOT_OWNER, DELETE_UNKNOWN, WriteBehindQueue, is_pending_id
+
+logger = logging.getLogger(__name__)
+
+# Command name for each trigger word, used to dispatch and to label metrics
+COMMANDS: Dict[str, str] = {
+    trigger: command
+    for command, triggers in (
+        ("beer", BEER_TRIGGERS),
+        ("size", SIZE_TRIGGERS),
+        ("staff", STAFF_TRIGGERS),
+        ("hagehige", HAGEHIGE_TRIGGERS),
+        ("yurie", YURIE_TRIGGERS),
+        ("adam", ADAM_TRIGGERS),
+        ("my_beers", MY_BEERS_TRIGGERS),
+        ("recommend", RECOMMEND_TRIGGERS),
+    )
+    for trigger in triggers
+}
+
+POSTBACK_ACTIONS = ("beer_page", "my_beers_page", "save_beer", "delete_beer")
+
+MENU_UNAVAILABLE_MESSAGE = {
+    "type": "text",
+    "text": "Sorry, the beer menu is temporarily unavailable. Please try again in a few minutes."
+}
+
+SAVED_BEERS_UNAVAILABLE_MESSAGE = {
+    "type": "text",
+    "text": "Sorry, couldn't load your saved beers. Try again later."
+}
+
+MENU_CHANGED_MESSAGE = {
+    "type": "text",
+    "text": "The menu has changed since then. Type 'beer' to see what's on tap now."
+}
 
 
 def verify_signature(body: bytes, signature: str) -> bool:
@@ -44,7 +115,7 @@ def verify_signature(body: bytes, signature: str) -> bool:
     return hmac.compare_digest(signature, expected_signature)
 
 
-def handle_message(event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+async def handle_message(event: Dict[str, Any]) -> Optional[Reply]:
     """
     Handle an incoming Line message event.
     Returns the flex message to reply with, or None.
@@ -53,299 +124,885 @@ def handle_message(event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
     if message.get("type") != "text":
         return None
 
-    text = message.get("text", "").strip().lower()
+    text = message.get("text", "").strip()
+    command = COMMANDS.get(text.lower())
+    if command is None:
+        # "beer ipa", "beer >7%", "beer top": a beer trigger followed by a query
+        trigger, _, query = text.partition(" ")
+        if COMMANDS.get(trigger.lower()) != "beer" or not query.strip():
+            return None
+        direct = event.get("source", {}).get("type") == "user"
+        with handler_duration.time("message", "beer_search"):
+            return await search_menu(query, direct)
+
+    with handler_duration.time("message", command):
+        return await run_command(command, event)
+
+
+async def run_command(command: str, event: Dict[str, Any]) -> Optional[Reply]:
+    """Build the reply for a recognized command."""
+    # Beer command - served from the menu cache
+    if command == "beer":
+        snapshot = await menu_cache.get_snapshot()
+        if snapshot and snapshot.beers:
+            return render_beer_carousel(snapshot.beers, snapshot.version)
+        return MENU_UNAVAILABLE_MESSAGE
 
-    # Beer command - scrape on demand
-    if text in BEER_TRIGGERS:
-        beers = scrape_beers()
-        if beers:
-            return build_beer_carousel(beers)
-        return None
+    # My beers command
+    if command == "my_beers":
+        user_id = event.get("source", {}).get("userId", "")
+        return await get_saved_beers(user_id)
 
-    # Size command
-    if text in SIZE_TRIGGERS:
-        return build_size_message()
+    # Recommend command - beers on tap like the user's saved ones
+    if command == "recommend":
+        user_id = event.get("source", {}).get("userId", "")
+        return await recommend_beers(user_id)
 
-    # Staff command
-    if text in STAFF_TRIGGERS:
-        return build_staff_carousel()
+    # Size, staff, hagehige, yurie and adam are pre-rendered
+    return static_messages.get(command)
 
-    # Hagehige command
-    if text in HAGEHIGE_TRIGGERS:
-        return build_hagehige_carousel()
 
-    # Yurie command
-    if text in YURIE_TRIGGERS:
-        return build_personal_message("yurie")
+async def search_menu(text: str, direct: bool = True) -> Optional[Reply]:
+    """
+    Reply to a menu query with the matching beers, using the current version's index.
+    In group chats, "beer tonight?" is conversation rather than a query: text
+    without an ABV filter or "top" only gets a reply when it matches something.
+    """
+    query = MenuQuery.parse(text)
+    explicit = direct or query.top or query.min_abv is not None or query.max_abv is not None
+
+    snapshot = await menu_cache.get_snapshot()
+    if not snapshot or not snapshot.beers:
+        return MENU_UNAVAILABLE_MESSAGE if explicit else None
+
+    if query.is_empty:
+        return render_beer_carousel(snapshot.beers, snapshot.version) if direct else None
+    indices = menu_index(snapshot.beers, snapshot.version).search(query)
+    if not indices:
+        if not explicit:
+            return None
+        return {
+            "type": "text",
+            "text": f"Nothing on tap matches \"{text.strip()}\". Try 'beer ipa', 'beer >7%' or 'beer top'.",
+        }
 
-    # Adam command
-    if text in ADAM_TRIGGERS:
-        return build_personal_message("adam")
+    carousel = render_search_carousel(snapshot.beers, snapshot.version, indices, query.key())
+    if len(indices) <= BEER_PAGE_SIZE:
+        return carousel
+    return [carousel, {
+        "type": "text",
+        "text": (
+            f"Showing {BEER_PAGE_SIZE} of {len(indices)} matches. "
+            "Add a style, brewery or ABV to narrow it down, e.g. 'beer ipa >7%' or 'beer stout top'."
+        ),
+    }]
+
+
+async def recommend_beers(user_id: str) -> Reply:
+    """Reply with the beers on tap most like the user's saved beers."""
+    snapshot = await menu_cache.get_snapshot()
+    if not snapshot or not snapshot.beers:
+        return MENU_UNAVAILABLE_MESSAGE
+
+    saved = await load_all_saved(user_id)
+    if saved is None:
+        return SAVED_BEERS_UNAVAILABLE_MESSAGE
+    if not saved:
+        return {
+            "type": "text",
+            "text": "Save a few beers from the 'beer' menu first, and I'll recommend what's on tap to match.",
+        }
 
-    # My beers command
-    if text in MY_BEERS_TRIGGERS:
-        user_id = event.get("source", {}).get("userId", "")
-        return get_saved_beers(user_id)
+    indices = menu_features(snapshot.beers, snapshot.version).recommend(saved, RECOMMEND_COUNT)
+    if not indices:
+        return {
+            "type": "text",
+            "text": "You've already saved everything on tap. Cheers! 🍻",
+        }
+    with render_duration.time("recommend_carousel"):
+        return serialize_message(
+            build_search_carousel(snapshot.beers, indices, snapshot.version, alt_text="🍺 Recommended for you")
+        )
 
-    return None
+
+# Columns recommendations need from /mybeers, read in the API's largest pages
+RECOMMEND_FIELDS = "beer_name,brewery,style,abv"
+RECOMMEND_PAGE_LIMIT = 50
+
+
+class SavedProfileCache:
+    """
+    Bounded LRU of the saved beers "recommend" reads, keyed by user. Entries
+    are dropped when the bot saves or deletes a beer for the user, and
+    refetched after `ttl` to pick up writes made by other workers.
+    """
+
+    def __init__(self, max_entries: int = RECOMMEND_CACHE_MAX_ENTRIES, ttl: float = SAVED_BEERS_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._profiles: "OrderedDict[str, Tuple[float, List[Beer]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, user_id: str) -> Optional[List[Beer]]:
+        entry = self._profiles.get(user_id)
+        if entry is None or time.monotonic() - entry[0] > self.ttl:
+            self.misses += 1
+            return None
+        self._profiles.move_to_end(user_id)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, user_id: str, beers: List[Beer]) -> List[Beer]:
+        self._profiles.pop(user_id, None)
+        self._profiles[user_id] = (time.monotonic(), beers)
+        while len(self._profiles) > self.max_entries:
+            self._profiles.popitem(last=False)
+            self.evictions += 1
+        return beers
+
+    def invalidate(self, user_id: str) -> None:
+        self._profiles.pop(user_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._profiles),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else None,
+            "evictions": self.evictions,
+        }
+
+
+recommend_profiles = SavedProfileCache()
 
 
-def get_saved_beers(user_id: str) -> Optional[Dict[str, Any]]:
-    """Get user's saved beers from Oracle API."""
-    import json
+async def load_all_saved(user_id: str, max_beers: int = RECOMMEND_MAX_SAVED) -> Optional[List[Beer]]:
+    """
+    The user's saved beers, newest first and up to `max_beers`, with only the
+    columns recommendations use. Served from `recommend_profiles` until the
+    user saves or deletes a beer. Returns None if an API call failed.
+    """
+    cached = recommend_profiles.get(user_id)
+    if cached is not None:
+        return cached[:max_beers]
 
+    await _flush_pending(user_id)
+    beers: List[Beer] = []
+    after = None
     try:
-        response = requests.get(f"{SCRAPER_API_URL}/mybeers/{user_id}", timeout=10)
-        response.raise_for_status()
-        beers = response.json()
+        while len(beers) < max_beers:
+            params = {"limit": RECOMMEND_PAGE_LIMIT, "fields": RECOMMEND_FIELDS}
+            if after:
+                params["after"] = after
+            response = await scraper_request("GET", f"/mybeers/{user_id}", params=params)
+            page = response.json()
+            beers.extend(decode_saved(page.get("beers")))
+            after = page.get("next")
+            if not after:
+                break
+    except Exception as e:
+        logger.error("Error getting saved beers: %s", e, extra={"user": redact_user(user_id)})
+        return None
+    return recommend_profiles.put(user_id, beers[:max_beers])
 
-        if not beers:
-            return {
-                "type": "text",
-                "text": "You haven't saved any beers yet!\n\nType 'beer' to see the menu and save your favorites."
-            }
 
-        # Build carousel of saved beers
-        bubbles = []
-        for beer in beers[:10]:  # Limit to 10
-            delete_data = json.dumps({
-                "action": "delete_beer",
-                "id": beer.get("id"),
-                "name": beer.get("beer_name", "")
-            })
-
-            bubble = {
-                "type": "bubble",
-                "size": "kilo",
-                "hero": {
-                    "type": "image",
-                    "url": beer.get("label", "") or "https://assets.untappd.com/site/assets/images/temp/badge-beer-default.png",
-                    "size": "full",
-                    "aspectMode": "cover",
-                    "aspectRatio": "1:1",
-                },
-                "body": {
-                    "type": "box",
-                    "layout": "vertical",
-                    "contents": [
-                        {
-                            "type": "text",
-                            "text": beer.get("beer_name", "Unknown"),
-                            "weight": "bold",
-                            "size": "lg",
-                            "wrap": True,
-                            "color": "#FFFFFF",
-                        },
-                        {
-                            "type": "text",
-                            "text": beer.get("brewery", ""),
-                            "color": "#AAAAAA",
-                            "size": "md",
-                            "wrap": True,
-                        },
-                        {
-                            "type": "text",
-                            "text": beer.get("style", ""),
-                            "size": "sm",
-                            "wrap": True,
-                            "color": "#CCCCCC",
-                        },
-                        {
-                            "type": "box",
-                            "layout": "horizontal",
-                            "contents": [
-                                {
-                                    "type": "text",
-                                    "text": f"ABV: {beer.get('abv', '')}",
-                                    "size": "xs",
-                                    "color": "#CCCCCC",
-                                },
-                                {
-                                    "type": "text",
-                                    "text": f"Rating: {beer.get('rating', '')}",
-                                    "size": "xs",
-                                    "align": "end",
-                                    "color": "#CCCCCC",
-                                },
-                            ],
-                            "margin": "md",
-                        },
-                        {
-                            "type": "text",
-                            "text": f"Saved: {beer.get('saved_at', '')}",
-                            "size": "xs",
-                            "color": "#888888",
-                            "margin": "md",
-                        },
-                    ],
-                    "spacing": "sm",
-                    "paddingAll": "13px",
-                    "backgroundColor": "#333333",
-                },
-                "footer": {
-                    "type": "box",
-                    "layout": "vertical",
-                    "contents": [
-                        {
-                            "type": "button",
-                            "action": {
-                                "type": "postback",
-                                "label": "🗑️ Delete",
-                                "data": delete_data,
-                                "displayText": f"Deleting {beer.get('beer_name', '')[:20]}...",
-                            },
-                            "style": "secondary",
-                            "height": "sm",
-                        }
-                    ],
-                    "backgroundColor": "#333333",
-                    "paddingTop": "5px",
-                },
-                "styles": {
-                    "hero": {"backgroundColor": "#333333"},
-                },
-            }
-            bubbles.append(bubble)
+async def _flush_pending(user_id: str) -> None:
+    """Make sure the user's queued saves and deletes are visible before reading back."""
+    if write_queue.has_pending(user_id):
+        await write_queue.flush()
+
+
+# Columns the saved-beers carousel needs from /mybeers
+SAVED_BEER_FIELDS = "id,beer_name,brewery,style,abv,rating,label,saved_at"
+
+
+def saved_beer_cursor(beer: Beer) -> str:
+    """Keyset cursor for a saved beer, matching the /mybeers format."""
+    return f"{beer.saved_at}|{beer.id}"
+
+
+class SavedBeersPage:
+    """One cached "my beers" page, its rendered message and validator."""
 
+    __slots__ = ("beers", "next_cursor", "etag", "fetched_at", "rendered")
+
+    def __init__(
+        self,
+        beers: List[Beer],
+        next_cursor: Optional[str],
+        etag: str = "",
+        fetched_at: Optional[float] = None,
+    ):
+        self.beers = beers
+        self.next_cursor = next_cursor
+        self.etag = etag
+        self.fetched_at = time.monotonic() if fetched_at is None else fetched_at
+        self.rendered = b""
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.fetched_at
+
+
+class SavedBeersCache:
+    """
+    Bounded LRU of rendered "my beers" pages keyed by (user_id, cursor).
+    Pages are patched in place when the bot saves or deletes a beer, so
+    repeat views are answered without calling the Oracle VM. Pages older
+    than `ttl` are revalidated with their ETag.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = SAVED_BEERS_CACHE_MAX_ENTRIES,
+        max_bytes: int = SAVED_BEERS_CACHE_MAX_BYTES,
+        ttl: float = SAVED_BEERS_CACHE_TTL,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._pages: "OrderedDict[Tuple[str, str], SavedBeersPage]" = OrderedDict()
+        self._user_cursors: Dict[str, Set[str]] = {}
+        self._bytes = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.patches = 0
+        self.revalidated = 0
+
+    def get(self, user_id: str, cursor: str) -> Optional[SavedBeersPage]:
+        """Return the cached page, fresh or not; callers revalidate stale pages."""
+        page = self._pages.get((user_id, cursor))
+        if page is None:
+            self.misses += 1
+            return None
+        self._pages.move_to_end((user_id, cursor))
+        if page.age <= self.ttl:
+            self.hits += 1
+        else:
+            self.stale_hits += 1
+        return page
+
+    def put(
+        self,
+        user_id: str,
+        cursor: str,
+        beers: List[Beer],
+        next_cursor: Optional[str],
+        etag: str = "",
+    ) -> SavedBeersPage:
+        """Render and cache a page."""
+        page = SavedBeersPage(beers, next_cursor, etag)
+        self._store(user_id, cursor, page)
+        return page
+
+    def mark_revalidated(self, page: SavedBeersPage) -> SavedBeersPage:
+        """Reset a page's age after the API answered 304 Not Modified."""
+        page.fetched_at = time.monotonic()
+        self.revalidated += 1
+        return page
+
+    def add_beer(self, user_id: str, beer: Beer) -> None:
+        """Patch a newly saved beer into the user's first page."""
+        if beer.id is None:
+            self.invalidate(user_id)
+            return
+        page = self._pages.get((user_id, ""))
+        if page is None:
+            return
+
+        # The API ignores saving a beer twice (same name and brewery), leaving its
+        # pages and their ETags unchanged, so a patched-in copy would never be refetched
+        key = (beer.name, beer.brewery)
+        pages = self._cached_chain(user_id)
+        if any((saved.name, saved.brewery) == key for cached in pages for saved in cached.beers):
+            return
+        if pages[-1].next_cursor:
+            # It may be on an older page that isn't cached: let the next read refetch
+            self.invalidate(user_id)
+            return
+
+        beers = [beer] + page.beers
+        next_cursor = page.next_cursor
+        if len(beers) > SAVED_BEERS_PAGE_SIZE:
+            # Push the oldest beer back onto the next page
+            beers.pop()
+            next_cursor = saved_beer_cursor(beers[-1])
+        self.patches += 1
+        self._store(user_id, "", SavedBeersPage(beers, next_cursor, page.etag, page.fetched_at))
+
+    def _cached_chain(self, user_id: str) -> List[SavedBeersPage]:
+        """The user's cached pages from the first one on, up to the first page not cached."""
+        pages = []
+        page = self._pages.get((user_id, ""))
+        while page is not None:
+            pages.append(page)
+            if not page.next_cursor:
+                break
+            page = self._pages.get((user_id, page.next_cursor))
+        return pages
+
+    def owns(self, user_id: str, beer_id: Any) -> Optional[bool]:
+        """
+        Whether a saved beer is on the user's cached pages: True if it is, False
+        if every page of the user's list is cached, fresh and without it, None
+        if unknown (another worker may have saved it since a page was fetched).
+        """
+        pages = self._cached_chain(user_id)
+        if any(beer.id == beer_id for cached in pages for beer in cached.beers):
+            return True
+        if pages and not pages[-1].next_cursor and all(page.age <= self.ttl for page in pages):
+            return False
+        return None
+
+    def resolve_id(self, user_id: str, pending_id: str, beer_id: int, saved_at: str) -> None:
+        """Replace a queued save's placeholder id once the batch is flushed."""
+        for cursor in list(self._user_cursors.get(user_id, ())):
+            # Re-storing a patched page can evict the user's other pages
+            page = self._pages.get((user_id, cursor))
+            if page is None or not any(beer.id == pending_id for beer in page.beers):
+                continue
+            beers = [
+                beer.saved_as(beer_id, saved_at or beer.saved_at) if beer.id == pending_id else beer
+                for beer in page.beers
+            ]
+            self._store(user_id, cursor, SavedBeersPage(beers, page.next_cursor, page.etag, page.fetched_at))
+
+    def remove_beer(self, user_id: str, beer_id: Any) -> Optional[Beer]:
+        """Patch a deleted beer out of every cached page for the user; returns it if it was cached."""
+        removed = None
+        for cursor in list(self._user_cursors.get(user_id, ())):
+            page = self._pages.get((user_id, cursor))
+            if page is None:
+                continue
+            beers = [beer for beer in page.beers if beer.id != beer_id]
+            if len(beers) == len(page.beers):
+                continue
+            removed = next(beer for beer in page.beers if beer.id == beer_id)
+            self.patches += 1
+            if not beers and page.next_cursor:
+                # An emptied page with older beers behind it must be refetched
+                self._discard(user_id, cursor)
+            else:
+                self._store(user_id, cursor, SavedBeersPage(beers, page.next_cursor, page.etag, page.fetched_at))
+        return removed
+
+    def invalidate(self, user_id: str) -> None:
+        for cursor in list(self._user_cursors.get(user_id, ())):
+            self._discard(user_id, cursor)
+
+    def _store(self, user_id: str, cursor: str, page: SavedBeersPage) -> None:
+        # Patched pages keep the validator of the page they came from; it will
+        # no longer match once the API has the write, forcing a full refetch
+        # (add_beer never patches in a save the API would ignore)
+        with render_duration.time("saved_beers"):
+            page.rendered = serialize_message(build_saved_beers_message(page.beers, page.next_cursor, cursor))
+        self._discard(user_id, cursor)
+        self._pages[(user_id, cursor)] = page
+        self._user_cursors.setdefault(user_id, set()).add(cursor)
+        self._bytes += len(page.rendered)
+        while self._pages and (len(self._pages) > self.max_entries or self._bytes > self.max_bytes):
+            (old_user, old_cursor), _ = next(iter(self._pages.items()))
+            self._discard(old_user, old_cursor)
+            self.evictions += 1
+
+    def _discard(self, user_id: str, cursor: str) -> None:
+        page = self._pages.pop((user_id, cursor), None)
+        if page is None:
+            return
+        self._bytes -= len(page.rendered)
+        cursors = self._user_cursors[user_id]
+        cursors.discard(cursor)
+        if not cursors:
+            del self._user_cursors[user_id]
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.stale_hits + self.misses
         return {
-            "type": "flex",
-            "altText": "⭐ Your Saved Beers",
-            "contents": {"type": "carousel", "contents": bubbles},
+            "entries": len(self._pages),
+            "users": len(self._user_cursors),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.hits + self.stale_hits) / lookups, 3) if lookups else None,
+            "evictions": self.evictions,
+            "patches": self.patches,
+            "revalidated": self.revalidated,
         }
 
+
+saved_beers_cache = SavedBeersCache()
+write_queue = WriteBehindQueue(on_saved=saved_beers_cache.resolve_id)
+
+
+async def load_saved_page(user_id: str, after: Optional[str] = None) -> Optional[SavedBeersPage]:
+    """
+    Get one page of the user's saved beers.
+    Pages are served from the per-user cache when possible, and fetched from
+    the Oracle API otherwise. `after` is the cursor returned with the previous page.
+    A stale cached page is served if revalidating it fails; returns None if
+    the API call failed and nothing was cached.
+    """
+    cursor = after or ""
+    cached = saved_beers_cache.get(user_id, cursor)
+    if cached is not None and cached.age <= saved_beers_cache.ttl:
+        return cached
+
+    await _flush_pending(user_id)
+
+    try:
+        params = {"limit": SAVED_BEERS_PAGE_SIZE, "fields": SAVED_BEER_FIELDS}
+        if after:
+            params["after"] = after
+        headers = {"If-None-Match": cached.etag} if cached is not None and cached.etag else {}
+        response = await scraper_request("GET", f"/mybeers/{user_id}", params=params, headers=headers)
+        if response.status_code == 304:
+            return saved_beers_cache.mark_revalidated(cached)
+        page = response.json()
     except Exception as e:
-        print(f"Error getting saved beers: {e}")
+        logger.error("Error getting saved beers: %s", e, extra={"user": redact_user(user_id)})
+        return cached
+
+    return saved_beers_cache.put(
+        user_id,
+        cursor,
+        decode_saved(page.get("beers")),
+        page.get("next"),
+        response.headers.get("ETag", ""),
+    )
+
+
+async def get_saved_beers(user_id: str, after: Optional[str] = None) -> Optional[Message]:
+    """Get one page of the user's saved beers as a rendered carousel."""
+    page = await load_saved_page(user_id, after)
+    if page is None:
+        return SAVED_BEERS_UNAVAILABLE_MESSAGE
+    return page.rendered
+
+
+def build_saved_beers_message(
+    beers: List[Beer],
+    next_cursor: Optional[str],
+    after: str = "",
+) -> Dict[str, Any]:
+    """Build the saved-beers carousel for one page."""
+    if not beers:
+        if after:
+            return {"type": "text", "text": "That's all of your saved beers!"}
         return {
             "type": "text",
-            "text": "Sorry, couldn't load your saved beers. Try again later."
+            "text": "You haven't saved any beers yet!\n\nType 'beer' to see the menu and save your favorites."
+        }
+
+    # Build carousel of saved beers
+    bubbles = []
+    for beer in beers:
+        delete_data = delete_postback(beer.id)
+
+        bubble = {
+            "type": "bubble",
+            "size": "kilo",
+            "hero": {
+                "type": "image",
+                "url": beer.label or "https://assets.untappd.com/site/assets/images/temp/badge-beer-default.png",
+                "size": "full",
+                "aspectMode": "cover",
+                "aspectRatio": "1:1",
+            },
+            "body": {
+                "type": "box",
+                "layout": "vertical",
+                "contents": [
+                    {
+                        "type": "text",
+                        "text": beer.name,
+                        "weight": "bold",
+                        "size": "lg",
+                        "wrap": True,
+                        "color": "#FFFFFF",
+                    },
+                    {
+                        "type": "text",
+                        "text": beer.brewery,
+                        "color": "#AAAAAA",
+                        "size": "md",
+                        "wrap": True,
+                    },
+                    {
+                        "type": "text",
+                        "text": beer.style,
+                        "size": "sm",
+                        "wrap": True,
+                        "color": "#CCCCCC",
+                    },
+                    {
+                        "type": "box",
+                        "layout": "horizontal",
+                        "contents": [
+                            {
+                                "type": "text",
+                                "text": f"ABV: {beer.abv}",
+                                "size": "xs",
+                                "color": "#CCCCCC",
+                            },
+                            {
+                                "type": "text",
+                                "text": f"Rating: {beer.rating}",
+                                "size": "xs",
+                                "align": "end",
+                                "color": "#CCCCCC",
+                            },
+                        ],
+                        "margin": "md",
+                    },
+                    {
+                        "type": "text",
+                        "text": f"Saved: {beer.saved_at}",
+                        "size": "xs",
+                        "color": "#888888",
+                        "margin": "md",
+                    },
+                ],
+                "spacing": "sm",
+                "paddingAll": "13px",
+                "backgroundColor": "#333333",
+            },
+            "footer": {
+                "type": "box",
+                "layout": "vertical",
+                "contents": [
+                    {
+                        "type": "button",
+                        "action": {
+                            "type": "postback",
+                            "label": "🗑️ Delete",
+                            "data": delete_data,
+                            "displayText": f"Deleting {beer.name[:20]}...",
+                        },
+                        "style": "secondary",
+                        "height": "sm",
+                    }
+                ],
+                "backgroundColor": "#333333",
+                "paddingTop": "5px",
+            },
+            "styles": {
+                "hero": {"backgroundColor": "#333333"},
+            },
         }
+        bubbles.append(bubble)
 
+    if next_cursor:
+        bubbles.append(build_show_older_bubble(next_cursor))
 
-def reply_message(reply_token: str, message: Dict[str, Any]) -> bool:
-    """Send a reply message via Line Messaging API."""
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {LINE_CHANNEL_ACCESS_TOKEN}",
+    return {
+        "type": "flex",
+        "altText": "⭐ Your Saved Beers",
+        "contents": {"type": "carousel", "contents": bubbles},
     }
 
-    payload = {
-        "replyToken": reply_token,
-        "messages": [message],
+
+def build_show_older_bubble(cursor: str) -> Dict[str, Any]:
+    """Build the trailing bubble that requests the next page of saved beers."""
+    older_data = json.dumps({"action": "my_beers_page", "after": cursor})
+
+    return {
+        "type": "bubble",
+        "size": "kilo",
+        "body": {
+            "type": "box",
+            "layout": "vertical",
+            "contents": [
+                {
+                    "type": "text",
+                    "text": "Older saved beers",
+                    "weight": "bold",
+                    "size": "lg",
+                    "align": "center",
+                    "color": "#FFFFFF",
+                },
+            ],
+            "justifyContent": "center",
+            "paddingAll": "13px",
+            "backgroundColor": "#333333",
+        },
+        "footer": {
+            "type": "box",
+            "layout": "vertical",
+            "contents": [
+                {
+                    "type": "button",
+                    "action": {
+                        "type": "postback",
+                        "label": "Show older →",
+                        "data": older_data,
+                        "displayText": "Show older saved beers",
+                    },
+                    "style": "secondary",
+                    "height": "sm",
+                }
+            ],
+            "backgroundColor": "#333333",
+        },
     }
 
+
+def build_messages_payload(field: str, value: str, reply: Reply) -> bytes:
+    """
+    Splice one or more (possibly pre-serialized) messages into a reply or push
+    payload, trimmed or split to fit Line's size and message-count limits.
+    Returns b"" if nothing is left to send.
+    """
+    messages = fit_reply(reply)
+    if not messages:
+        return b""
+    return b"".join((
+        b'{"', field.encode("ascii"), b'":',
+        json_codec.dumps(value),
+        b',"messages":[',
+        b",".join(messages),
+        b"]}",
+    ))
+
+
+def build_reply_payload(reply_token: str, reply: Reply) -> bytes:
+    """Build a reply payload; see build_messages_payload."""
+    return build_messages_payload("replyToken", reply_token, reply)
+
+
+async def send_messages(url: str, endpoint: str, payload: bytes) -> bool:
+    """POST a reply or push payload to the Line Messaging API."""
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {LINE_CHANNEL_ACCESS_TOKEN}",
+    }
+    start = time.perf_counter()
     try:
-        response = requests.post(LINE_REPLY_URL, headers=headers, json=payload, timeout=10)
+        response = await get_line_client().post(url, headers=headers, content=payload)
         response.raise_for_status()
         return True
-    except requests.RequestException as e:
-        print(f"Error sending reply: {e}")
+    except httpx.HTTPError as e:
+        upstream_errors.inc("line", endpoint, error_reason(e))
+        logger.error("Error sending %s: %s", endpoint.lstrip("/"), e)
         return False
+    finally:
+        upstream_duration.observe(time.perf_counter() - start, "line", endpoint)
 
 
-def handle_postback(event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-    """Handle postback events (button clicks)."""
-    import json
+async def reply_message(reply_token: str, reply: Reply) -> bool:
+    """Send a reply (a message or a list of up to five) via Line Messaging API."""
+    payload = build_reply_payload(reply_token, reply)
+    if not payload:
+        logger.error("Reply had no messages left after fitting Line's limits")
+        return False
+    return await send_messages(LINE_REPLY_URL, "/reply", payload)
 
-    postback = event.get("postback", {})
-    data_str = postback.get("data", "")
 
-    try:
-        data = json.loads(data_str)
-    except json.JSONDecodeError:
+async def push_message(to: str, reply: Reply) -> bool:
+    """Push messages to a user, group or room (used once a reply token has expired)."""
+    payload = build_messages_payload("to", to, reply)
+    if not payload:
+        logger.error("Push had no messages left after fitting Line's limits")
+        return False
+    return await send_messages(LINE_PUSH_URL, "/push", payload)
+
+
+def push_target(event: Dict[str, Any]) -> Optional[str]:
+    """The chat an event came from: its group, room or user."""
+    source = event.get("source", {})
+    return source.get("groupId") or source.get("roomId") or source.get("userId")
+
+
+async def handle_postback(event: Dict[str, Any]) -> Optional[Reply]:
+    """Handle postback events (button clicks)."""
+    postback = event.get("postback", {})
+    data = decode_postback(postback.get("data", ""))
+    if data is None:
         return None
 
     action = data.get("action")
+    if action not in POSTBACK_ACTIONS:
+        return None
     user_id = event.get("source", {}).get("userId", "")
 
+    with handler_duration.time("postback", action):
+        return await run_postback(action, data, user_id)
+
+
+async def run_postback(action: str, data: Dict[str, Any], user_id: str) -> Optional[Reply]:
+    """Build the reply for a recognized postback action."""
+    if action == "beer_page":
+        # Render only the requested page, from the same menu version if it is retained
+        snapshot = menu_cache.snapshot_for(data.get("v", "")) or await menu_cache.get_snapshot()
+        page = data.get("page", 0)
+        if not snapshot or not isinstance(page, int) or not 0 <= page < page_count(snapshot.beers):
+            return MENU_CHANGED_MESSAGE
+        return render_beer_carousel(snapshot.beers, snapshot.version, page)
+
+    if action == "my_beers_page":
+        return await get_saved_beers(user_id, data.get("after"))
+
     if action == "save_beer":
-        beer_name = data.get("name", "Unknown")
-        brewery = data.get("brewery", "")
-        style = data.get("style", "")
-        abv = data.get("abv", "")
-        rating = data.get("rating", "")
-        label = data.get("label", "")
-
-        # Save to database via Oracle API
-        try:
-            save_response = requests.post(
-                f"{SCRAPER_API_URL}/save",
-                json={
-                    "user_id": user_id,
-                    "beer_name": beer_name,
-                    "brewery": brewery,
-                    "style": style,
-                    "abv": abv,
-                    "rating": rating,
-                    "label": label,
-                },
-                timeout=10
-            )
-            save_response.raise_for_status()
-            print(f"Saved beer '{beer_name}' for user {user_id}")
-        except Exception as e:
-            print(f"Error saving beer: {e}")
-            return {
-                "type": "text",
-                "text": f"Sorry, couldn't save the beer. Try again later."
-            }
+        if "index" in data:
+            beer = menu_beer(data.get("v", ""), data["index"])
+            if beer is None:
+                return MENU_CHANGED_MESSAGE
+        else:
+            # Carousels sent before menu tokens carry the beer itself
+            beer = Beer.from_api(data)
+            if beer is None:
+                return None
+
+        # Queue the write for the next batch to the Oracle API and reply right away
+        pending = write_queue.save(user_id, beer.to_saved())
+        recommend_profiles.invalidate(user_id)
+        saved_beers_cache.add_beer(
+            user_id,
+            beer.saved_as(pending["id"], datetime.now().isoformat(timespec="seconds")),
+        )
+        logger.info("Queued save of %r", beer.name, extra={"user": redact_user(user_id)})
 
         return {
             "type": "text",
-            "text": f"⭐ Saved '{beer_name}' to your list!\n\nType 'my beers' to see your saved beers."
+            "text": f"⭐ Saved '{beer.name}' to your list!\n\nType 'my beers' to see your saved beers."
         }
 
     if action == "delete_beer":
-        beer_id = data.get("id")
-        beer_name = data.get("name", "Unknown")
-
-        try:
-            delete_response = requests.post(
-                f"{SCRAPER_API_URL}/delete",
-                json={
-                    "id": beer_id,
-                    "user_id": user_id,
-                },
-                timeout=10
-            )
-            delete_response.raise_for_status()
-            print(f"Deleted beer '{beer_name}' for user {user_id}")
-        except Exception as e:
-            print(f"Error deleting beer: {e}")
+        beer_id = write_queue.resolved_id(data.get("id"))
+
+        # The queue checks ownership of pending saves; the API silently ignores
+        # deleting someone else's flushed beer, so check it against the user's pages
+        owned = True if is_pending_id(beer_id) else saved_beers_cache.owns(user_id, beer_id)
+        if owned is False:
             return {
                 "type": "text",
-                "text": f"Sorry, couldn't delete the beer. Try again later."
+                "text": "You can only delete beers from your own list."
             }
 
+        # Cancels the save instead if it hasn't been flushed yet
+        outcome = write_queue.delete(user_id, beer_id)
+        if outcome == DELETE_NOT_OWNER:
+            return {
+                "type": "text",
+                "text": "You can only delete beers from your own list."
+            }
+        if outcome == DELETE_UNKNOWN:
+            # A button from before a restart: refetch so new buttons carry database ids
+            saved_beers_cache.invalidate(user_id)
+            return {
+                "type": "text",
+                "text": "Sorry, couldn't find that beer. Type 'my beers' to open your list again."
+            }
+        removed = saved_beers_cache.remove_beer(user_id, beer_id)
+        recommend_profiles.invalidate(user_id)
+        logger.info("Queued delete of beer %s", beer_id, extra={"user": redact_user(user_id)})
+        if owned is None:
+            # Not on a cached page (e.g. a carousel tapped by someone else in a
+            # group chat): the API deletes it only if it is the user's own
+            return {
+                "type": "text",
+                "text": "🗑️ Delete requested. Type 'my beers' to check your list."
+            }
+
+        # Delete buttons carry only the id; older carousels also carry the name
+        if removed is not None:
+            beer_name = removed.short_title
+        else:
+            beer_name = trim_string(str(data["name"]), 20) if data.get("name") else ""
         return {
             "type": "text",
-            "text": f"🗑️ Deleted '{beer_name}' from your list."
+            "text": f"🗑️ Deleted '{beer_name}' from your list." if beer_name else "🗑️ Deleted it from your list."
         }
 
     return None
 
 
-def process_webhook(body: Dict[str, Any]) -> None:
-    """Process the webhook body and handle all events."""
-    import json
-    print(f"=== WEBHOOK RECEIVED ===")
-    print(json.dumps(body, indent=2, ensure_ascii=False))
-    print(f"========================")
+def menu_beer(version: str, index: int) -> Optional[Beer]:
+    """Resolve a save button's menu version and index to the beer it showed."""
+    snapshot = menu_cache.snapshot_for(version)
+    if snapshot is None or not 0 <= index < len(snapshot.beers):
+        return None
+    return snapshot.beers[index]
+
 
+async def handle_event(event: Dict[str, Any], deadline: float) -> None:
+    """
+    Build and send the response to one event before its reply token expires
+    at `deadline` (monotonic clock). Late responses are pushed if
+    LINE_PUSH_FALLBACK is set and dropped otherwise; late commands are not
+    even built, but postbacks still run so saves and deletes are not lost.
+    """
+    event_type = event.get("type")
+    events_in_flight.inc()
+    try:
+        if time.monotonic() >= deadline and not LINE_PUSH_FALLBACK and event_type == "message":
+            expired_replies.inc("dropped")
+            logger.warning("Reply token expired before the event was handled")
+            return
+
+        response_message = None
+        if event_type == "message":
+            response_message = await handle_message(event)
+        elif event_type == "postback":
+            response_message = await handle_postback(event)
+        if not response_message:
+            return
+
+        if time.monotonic() < deadline:
+            await reply_message(event["replyToken"], response_message)
+            return
+        target = push_target(event)
+        if LINE_PUSH_FALLBACK and target:
+            expired_replies.inc("pushed")
+            await push_message(target, response_message)
+        else:
+            expired_replies.inc("dropped")
+            logger.warning("Reply token expired before the reply was ready")
+    finally:
+        events_in_flight.dec()
+
+
+event_scheduler = EventScheduler(handle_event)
+recent_events = RecentEventIds()
+
+
+def process_webhook(body: Dict[str, Any]) -> int:
+    """
+    Queue the decoded webhook body's events; they are handled in the background.
+    Events whose webhookEventId was already accepted (Line redelivers webhooks
+    it thinks were not received) are skipped without any upstream calls.
+    Returns the number of events dropped because the queue was full.
+    """
     events = body.get("events", [])
+    logger.info("Webhook received", extra={"events": [event.get("type") for event in events]})
+    if should_sample():
+        logger.info("Webhook payload", extra={"payload": redact_payload(body)})
 
+    rejected = 0
     for event in events:
         event_type = event.get("type")
-        reply_token = event.get("replyToken")
+        webhook_events.inc(event_type if event_type in ("message", "postback") else "other")
 
-        if not reply_token:
+        event_id = event.get("webhookEventId")
+        if event_id and recent_events.seen(event_id):
+            redelivery = bool(event.get("deliveryContext", {}).get("isRedelivery"))
+            duplicate_events.inc("true" if redelivery else "false")
+            logger.info("Skipping duplicate event", extra={"event_type": event_type, "redelivery": redelivery})
             continue
 
-        response_message = None
-
-        if event_type == "message":
-            response_message = handle_message(event)
-        elif event_type == "postback":
-            response_message = handle_postback(event)
-
-        if response_message:
-            reply_message(reply_token, response_message)
+        if not event.get("replyToken"):
+            continue
+        if not event_scheduler.submit(event):
+            # Not remembered: the webhook answers 503, and Line's redelivery is handled
+            rejected += 1
+        elif event_id:
+            recent_events.add(event_id)
+    return rejected
@@ -0,0 +1,118 @@
+import contextvars
+import hashlib
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+from .config import LOG_LEVEL, WEBHOOK_LOG_SAMPLE_RATE
+
+# Set per HTTP request by the middleware in main.py; "-" outside a request
+request_id: contextvars.ContextVar[str] = contextvars.ContextVar("request_id", default="-")
+
+# Attributes every LogRecord has; anything else was passed with `extra=`
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def new_request_id(incoming: str = "") -> str:
+    """Use the caller's request ID if it sent one, else generate one."""
+    rid = incoming[:64] if incoming else uuid.uuid4().hex[:16]
+    request_id.set(rid)
+    return rid
+
+
+def redact_user(user_id: str) -> str:
+    """Stable short hash of a Line user ID, so logs can be correlated without leaking it."""
+    if not user_id:
+        return "-"
+    return "u_" + hashlib.blake2b(user_id.encode("utf-8"), digest_size=6).hexdigest()
+
+
+def redact_payload(body: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of a webhook body with user/group/room IDs hashed and reply tokens removed."""
+    events = []
+    for event in body.get("events", []):
+        source = {
+            key: redact_user(value) if key.endswith("Id") else value
+            for key, value in event.get("source", {}).items()
+        }
+        events.append({
+            **{key: value for key, value in event.items() if key != "replyToken"},
+            "source": source,
+        })
+    redacted = {**body, "events": events}
+    if "destination" in body:
+        redacted["destination"] = redact_user(body["destination"])
+    return redacted
+
+
+def should_sample(rate: float = WEBHOOK_LOG_SAMPLE_RATE) -> bool:
+    """Whether to log the full payload of this webhook."""
+    return rate >= 1 or (rate > 0 and random.random() < rate)
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamp records with the current request ID in the emitting task."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, request ID, message and extras."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def setup_logging(level: str = LOG_LEVEL) -> None:
+    """
+    Send the app's logs through a queue to a background thread that formats
+    and writes them, so the event loop never blocks on stdout.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(RequestIdFilter())
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter())
+
+    logger = logging.getLogger("app")
+    logger.setLevel(level.upper())
+    logger.addHandler(queue_handler)
+    logger.propagate = False
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    _listener.start()
+
+
+def stop_logging() -> None:
+    """Flush queued records and stop the writer thread (called on shutdown)."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -1,16 +1,125 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request, HTTPException, Header
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from typing import Optional
 
-from .line_handler import verify_signature, process_webhook
+from . import json_codec
+from .circuit_breaker import OPEN, scraper_breaker
+from .flex_messages import carousel_cache_stats, prerender_beer_carousels, search_cache_stats
+from .http_client import close_clients, open_clients
+from .line_handler import (
+    verify_signature,
+    process_webhook,
+    event_scheduler,
+    recent_events,
+    recommend_profiles,
+    saved_beers_cache,
+    write_queue,
+)
+from .logging_setup import new_request_id, setup_logging, stop_logging
+from .metrics import Gauge, cache_metrics, registry
+from .scraper import menu_cache
+from .startup import startup
+from .static_messages import static_messages
+
+logger = logging.getLogger(__name__)
+
+
+def collect_state():
+    """Read cache and upstream state into metrics when /metrics is scraped."""
+    yield from cache_metrics({
+        "menu": menu_cache.stats(),
+        "beer_carousel": carousel_cache_stats(),
+        "menu_search": search_cache_stats(),
+        "saved_beers": saved_beers_cache.stats(),
+        "recommend_profiles": recommend_profiles.stats(),
+    })
+    breaker_open = Gauge("titans_circuit_breaker_open", "1 while the circuit breaker is open", ["breaker"])
+    breaker_open.set(1 if scraper_breaker.state == OPEN else 0, scraper_breaker.name)
+    yield breaker_open
+    pending = Gauge("titans_write_behind_pending", "Saves and deletes waiting to be flushed")
+    pending.set(write_queue.pending_count())
+    yield pending
+    queued = Gauge("titans_events_queued", "Webhook events waiting for a handler slot")
+    queued.set(event_scheduler.pending_count())
+    yield queued
+    menu_age = Gauge("titans_menu_age_seconds", "Age of the cached tap list")
+    if menu_cache.snapshot is not None:
+        menu_age.set(menu_cache.snapshot.age)
+    yield menu_age
+
+
+registry.add_collector(collect_state)
+
+
+async def wait_for_menu() -> None:
+    """Report readiness once the first tap list arrives (when none was saved on disk)."""
+    with startup.phase("first_menu_fetch"):
+        while menu_cache.snapshot is None:
+            if await menu_cache.refresh() is None:
+                await asyncio.sleep(5)
+    snapshot = menu_cache.snapshot
+    with startup.phase("prerender"):
+        prerender_beer_carousels(snapshot.beers, snapshot.version)
+    startup.mark_ready("scraper_api")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Set up and tear down shared resources."""
+    startup.begin()
+    with startup.phase("logging"):
+        setup_logging()
+    with startup.phase("static_messages"):
+        static_messages.load()
+    static_messages.start()
+    with startup.phase("http_clients"):
+        open_clients()
+    with startup.phase("menu_snapshot"):
+        loaded = menu_cache.load_snapshot()
+    if loaded:
+        with startup.phase("prerender"):
+            prerender_beer_carousels(menu_cache.snapshot.beers, menu_cache.snapshot.version)
+    menu_cache.start()
+    write_queue.start()
+    menu_waiter = None
+    if loaded:
+        startup.mark_ready("disk")
+    else:
+        menu_waiter = asyncio.create_task(wait_for_menu())
+    yield
+    if menu_waiter is not None:
+        menu_waiter.cancel()
+    try:
+        await event_scheduler.close()
+    finally:
+        # Saves queued by postbacks are flushed or spooled even if draining events failed
+        await write_queue.close()
+    await menu_cache.stop()
+    await static_messages.stop()
+    await close_clients()
+    stop_logging()
+
 
 app = FastAPI(
     title="Titans Beers Line Bot",
     description="Line bot for Titans Craft Beer Bar",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 
+@app.middleware("http")
+async def request_id_middleware(request: Request, call_next):
+    """Tag the request's log lines (and the response) with a request ID."""
+    rid = new_request_id(request.headers.get("X-Request-ID", ""))
+    response = await call_next(request)
+    response.headers["X-Request-ID"] = rid
+    return response
+
+
 @app.get("/")
 async def health_check():
     """Health check endpoint."""
@@ -30,25 +139,54 @@ async def webhook(
         if not verify_signature(body, x_line_signature):
             raise HTTPException(status_code=400, detail="Invalid signature")
 
-    # Parse and process the webhook
+    # Decode the same bytes the signature was checked against, once
     try:
-        body_json = await request.json()
-        process_webhook(body_json)
+        rejected = process_webhook(json_codec.loads(body))
     except Exception as e:
-        print(f"Error processing webhook: {e}")
+        logger.exception("Error processing webhook: %s", e)
         # Still return 200 to Line to prevent retries
-        pass
+        rejected = 0
 
+    if rejected:
+        # Ask Line to redeliver; the events that were queued are skipped as duplicates then
+        return JSONResponse(status_code=503, content={"status": "busy"})
     return JSONResponse(content={"status": "ok"})
 
 
 @app.get("/test-scrape")
 async def test_scrape():
     """Test endpoint to verify scraping works."""
-    from .scraper import scrape_beers
-
-    beers = scrape_beers()
+    beers = await menu_cache.get()
     return {
         "count": len(beers),
-        "beers": beers[:3] if beers else [],  # Return first 3 for testing
+        "beers": [beer.to_api() for beer in beers[:3]],  # Return first 3 for testing
+        "cache": menu_cache.stats(),
     }
+
+
+@app.get("/status")
+async def status():
+    """Report the state of upstream protection and caches."""
+    return {
+        "scraper_breaker": scraper_breaker.stats(),
+        "saved_beers_cache": saved_beers_cache.stats(),
+        "recommend_profiles": recommend_profiles.stats(),
+        "write_behind": write_queue.stats(),
+        "events": {**event_scheduler.stats(), "remembered_ids": len(recent_events)},
+        "json_backend": json_codec.BACKEND,
+        "startup": {"ready": startup.ready, **startup.report()},
+    }
+
+
+@app.get("/ready")
+async def ready():
+    """Readiness check: 503 until a tap list is loaded (from disk or the scraper API)."""
+    if not startup.ready:
+        return JSONResponse(status_code=503, content={"status": "starting"})
+    return {"status": "ready"}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus text exposition of latency histograms, error counts and cache state."""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
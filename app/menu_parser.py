@@ -0,0 +1,146 @@
+import os
+import re
+from typing import Callable, Dict, List
+
+UNTAPPD_BASE_URL = "https://untappd.com"
+
+NUMBER_PREFIX_RE = re.compile(r"^\d+\.\s*")
+ABV_RE = re.compile(r"([\d.]+)%\s*ABV")
+
+
+def _class_test(name: str) -> str:
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+def _build_beer(name: str, href: str, style: str, brewery: str, h6_text: str, rating: str, label: str) -> Dict[str, str]:
+    abv = ""
+    abv_match = ABV_RE.search(h6_text)
+    if abv_match:
+        abv = abv_match.group(1) + "%"
+
+    return {
+        "name": NUMBER_PREFIX_RE.sub("", name.strip()),
+        "brewery": brewery.strip(),
+        "style": style.strip(),
+        "abv": abv,
+        "label": label,
+        "rating": rating.strip().strip("()"),
+        "check_in": UNTAPPD_BASE_URL + href if href else "",
+    }
+
+
+def parse_with_html_parser(html: str) -> List[Dict[str, str]]:
+    """Parse with BeautifulSoup and the stdlib html.parser (original behavior)."""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    beers = []
+    for item in soup.select("li.menu-item"):
+        name_link = item.select_one("h5 a.track-click")
+        if not name_link:
+            continue
+
+        style_em = item.select_one("h5 em")
+        brewery_link = item.select_one("h6 a.track-click")
+        h6 = item.select_one("h6")
+        rating_span = item.select_one("span.num")
+        img = item.select_one(".beer-label img")
+
+        beers.append(_build_beer(
+            name=name_link.text,
+            href=name_link.get("href", ""),
+            style=style_em.text if style_em else "",
+            brewery=brewery_link.text if brewery_link else "",
+            h6_text=h6.get_text() if h6 else "",
+            rating=rating_span.text if rating_span else "",
+            label=img.get("src", "") if img else "",
+        ))
+    return beers
+
+
+_lxml_xpaths = None
+
+
+def _get_lxml_xpaths():
+    global _lxml_xpaths
+    if _lxml_xpaths is None:
+        from lxml import etree
+
+        track_click = _class_test("track-click")
+        _lxml_xpaths = {
+            "items": etree.XPath(f"//li[{_class_test('menu-item')}]"),
+            "name_link": etree.XPath(f"(.//h5//a[{track_click}])[1]"),
+            "style": etree.XPath("(.//h5//em)[1]"),
+            "brewery_link": etree.XPath(f"(.//h6//a[{track_click}])[1]"),
+            "h6": etree.XPath("(.//h6)[1]"),
+            "rating": etree.XPath(f"(.//span[{_class_test('num')}])[1]"),
+            "label": etree.XPath(f"(.//*[{_class_test('beer-label')}]//img)[1]"),
+        }
+    return _lxml_xpaths
+
+
+def parse_with_lxml(html: str) -> List[Dict[str, str]]:
+    """Parse with lxml and precompiled XPath expressions."""
+    import lxml.html
+
+    xpaths = _get_lxml_xpaths()
+    root = lxml.html.document_fromstring(html)
+
+    def first(name: str, item):
+        found = xpaths[name](item)
+        return found[0] if found else None
+
+    beers = []
+    for item in xpaths["items"](root):
+        name_link = first("name_link", item)
+        if name_link is None:
+            continue
+
+        style_em = first("style", item)
+        brewery_link = first("brewery_link", item)
+        h6 = first("h6", item)
+        rating_span = first("rating", item)
+        img = first("label", item)
+
+        beers.append(_build_beer(
+            name=name_link.text_content(),
+            href=name_link.get("href", ""),
+            style=style_em.text_content() if style_em is not None else "",
+            brewery=brewery_link.text_content() if brewery_link is not None else "",
+            h6_text=h6.text_content() if h6 is not None else "",
+            rating=rating_span.text_content() if rating_span is not None else "",
+            label=img.get("src", "") if img is not None else "",
+        ))
+    return beers
+
+
+BACKENDS: Dict[str, Callable[[str], List[Dict[str, str]]]] = {
+    "lxml": parse_with_lxml,
+    "html.parser": parse_with_html_parser,
+}
+
+
+def default_backend() -> str:
+    """The backend named by MENU_PARSER_BACKEND, else lxml if installed."""
+    backend = os.getenv("MENU_PARSER_BACKEND")
+    if backend:
+        return backend
+    try:
+        import lxml.html  # noqa: F401
+    except ImportError:
+        return "html.parser"
+    return "lxml"
+
+
+def parse_menu(html: str, backend: str = "") -> List[Dict[str, str]]:
+    """
+    Parse an Untappd venue page into a list of beer dictionaries
+    (name, brewery, style, abv, label, rating, check_in).
+    Backends: "lxml" (compiled XPath) or "html.parser" (BeautifulSoup).
+    """
+    backend = backend or default_backend()
+    try:
+        parser = BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Unknown menu parser backend: {backend}")
+    return parser(html)
@@ -0,0 +1,159 @@
+import re
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+
+from .models import Beer
+
+# "7%", ">7%", ">=6.5", "<5%", "7%+"
+ABV_QUERY_RE = re.compile(r"^(>=|<=|>|<)?(\d+(?:\.\d+)?)(%?)(\+?)$")
+NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+TOKEN_RE = re.compile(r"\w+")
+
+TOP_WORDS = ("top", "best")
+
+# Menu versions whose index is kept (the current one, plus a few for late postbacks)
+INDEX_CACHE_SIZE = 4
+
+
+def parse_number(text: str) -> Optional[float]:
+    """First number in a string such as "6.5%" or "3.78"; None for "N/A" or ""."""
+    match = NUMBER_RE.search(text)
+    return float(match.group()) if match else None
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens: "IPA - New England / Hazy" -> ["ipa", "new", "england", "hazy"]."""
+    return TOKEN_RE.findall(text.lower())
+
+
+class MenuQuery:
+    """
+    A parsed "beer ..." query: words matched against style and brewery,
+    an ABV range and whether to order by rating.
+    """
+
+    __slots__ = ("terms", "min_abv", "min_inclusive", "max_abv", "max_inclusive", "top")
+
+    def __init__(self):
+        self.terms: List[str] = []
+        self.min_abv: Optional[float] = None
+        self.min_inclusive = True
+        self.max_abv: Optional[float] = None
+        self.max_inclusive = True
+        self.top = False
+
+    @classmethod
+    def parse(cls, text: str) -> "MenuQuery":
+        query = cls()
+        for word in text.lower().split():
+            abv = ABV_QUERY_RE.match(word)
+            if abv and (abv.group(1) or abv.group(3) or abv.group(4)):
+                op, value = abv.group(1) or ">=", float(abv.group(2))
+                if op.startswith(">"):
+                    query.min_abv, query.min_inclusive = value, op == ">="
+                else:
+                    query.max_abv, query.max_inclusive = value, op == "<="
+            elif word in TOP_WORDS:
+                query.top = True
+            else:
+                query.terms.extend(tokenize(word))
+        return query
+
+    @property
+    def is_empty(self) -> bool:
+        return not self.terms and self.min_abv is None and self.max_abv is None and not self.top
+
+    def key(self) -> Tuple:
+        """Normalized form, used as the cache key for rendered results."""
+        return (
+            tuple(sorted(set(self.terms))),
+            self.min_abv, self.min_inclusive, self.max_abv, self.max_inclusive, self.top,
+        )
+
+
+class MenuIndex:
+    """
+    Search index over one menu version, built once when the version is first queried.
+    Style and brewery words go into an inverted index (word -> beer indices),
+    with a sorted vocabulary so "haz" finds "hazy"; ABVs are kept as a sorted
+    array for range lookups, and beers are pre-sorted by rating.
+    """
+
+    def __init__(self, beers: List[Beer]):
+        self.size = len(beers)
+        postings: Dict[str, Set[int]] = {}
+        abvs: List[Tuple[float, int]] = []
+        ratings: List[Tuple[float, int]] = []
+        for index, beer in enumerate(beers):
+            for token in tokenize(beer.style) + tokenize(beer.brewery):
+                postings.setdefault(token, set()).add(index)
+            abv = parse_number(beer.abv)
+            if abv is not None:
+                abvs.append((abv, index))
+            rating = parse_number(beer.rating)
+            if rating is not None:
+                ratings.append((-rating, index))
+
+        self.postings = {token: frozenset(indices) for token, indices in postings.items()}
+        self.vocabulary = sorted(self.postings)
+        abvs.sort()
+        self.abv_values = [abv for abv, _ in abvs]
+        self.abv_indices = [index for _, index in abvs]
+        ratings.sort()
+        self.by_rating = [index for _, index in ratings]
+
+    def match_word(self, word: str) -> Set[int]:
+        """Beers with a style or brewery word starting with `word`."""
+        matches: Set[int] = set()
+        position = bisect_left(self.vocabulary, word)
+        while position < len(self.vocabulary) and self.vocabulary[position].startswith(word):
+            matches |= self.postings[self.vocabulary[position]]
+            position += 1
+        return matches
+
+    def abv_range(self, query: MenuQuery) -> Set[int]:
+        """Beers whose ABV is within the query's bounds."""
+        low, high = 0, len(self.abv_values)
+        if query.min_abv is not None:
+            bound = bisect_left if query.min_inclusive else bisect_right
+            low = bound(self.abv_values, query.min_abv)
+        if query.max_abv is not None:
+            bound = bisect_right if query.max_inclusive else bisect_left
+            high = bound(self.abv_values, query.max_abv)
+        return set(self.abv_indices[low:high])
+
+    def search(self, query: MenuQuery) -> List[int]:
+        """Indices of matching beers: in menu order, or best rated first for "top"."""
+        candidates: Optional[Set[int]] = None
+        for word in query.terms:
+            matches = self.match_word(word)
+            candidates = matches if candidates is None else candidates & matches
+            if not candidates:
+                return []
+        if query.min_abv is not None or query.max_abv is not None:
+            in_range = self.abv_range(query)
+            candidates = in_range if candidates is None else candidates & in_range
+
+        if query.top:
+            if candidates is None:
+                return list(self.by_rating)
+            return [index for index in self.by_rating if index in candidates]
+        if candidates is None:
+            return list(range(self.size))
+        return sorted(candidates)
+
+
+_indexes: "OrderedDict[str, MenuIndex]" = OrderedDict()
+
+
+def menu_index(beers: List[Beer], version: str) -> MenuIndex:
+    """Return the index of a menu version, building it on first use."""
+    index = _indexes.get(version)
+    if index is None:
+        index = _indexes[version] = MenuIndex(beers)
+        while len(_indexes) > INDEX_CACHE_SIZE:
+            _indexes.popitem(last=False)
+    else:
+        _indexes.move_to_end(version)
+    return index
@@ -0,0 +1,251 @@
+import math
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple, TypeVar
+
+# Seconds; covers in-memory renders (sub-millisecond) up to upstream timeouts
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+Labels = Tuple[str, ...]
+M = TypeVar("M", bound="Metric")
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    """Base class: a named metric family with fixed label names."""
+
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Labels, float] = {} if labelnames else {(): 0}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in self._values.items()
+        ]
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Labels, float] = {} if labelnames else {(): 0}
+
+    def set(self, value: float, *labels: str) -> None:
+        self._values[labels] = value
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def render(self) -> List[str]:
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in self._values.items()
+        ]
+
+
+class Histogram(Metric):
+    """
+    Fixed-bucket histogram. `observe` is a bisect and two additions; buckets
+    are only made cumulative when /metrics is rendered.
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+        # Per label set: [bucket counts..., +Inf count], sum
+        self._counts: Dict[Labels, List[int]] = {}
+        self._sums: Dict[Labels, float] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        counts = self._counts.get(labels)
+        if counts is None:
+            counts = self._counts[labels] = [0] * (len(self.buckets) + 1)
+            self._sums[labels] = 0.0
+        counts[bisect_left(self.buckets, value)] += 1
+        self._sums[labels] += value
+
+    def time(self, *labels: str) -> "_Timer":
+        """Context manager that observes the elapsed time of its block."""
+        return _Timer(self, labels)
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        bucket_names = self.labelnames + ("le",)
+        for labels, counts in self._counts.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(bucket_names, labels + (_format_value(bound),))} {cumulative}"
+                )
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(self._sums[labels])}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram: Histogram, labels: Labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self) -> "_Timer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+
+
+class Registry:
+    """Metrics plus collectors that read existing stats() when /metrics is scraped."""
+
+    def __init__(self):
+        self._metrics: List[Metric] = []
+        self._collectors: List[Callable[[], Iterable[Metric]]] = []
+
+    def register(self, metric: M) -> M:
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], Iterable[Metric]]) -> None:
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            for metric in collector():
+                lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+handler_duration = registry.register(Histogram(
+    "titans_handler_duration_seconds",
+    "Time to build the reply for a command or postback action, excluding the reply call",
+    ["type", "name"],
+))
+upstream_duration = registry.register(Histogram(
+    "titans_upstream_request_duration_seconds",
+    "Duration of calls to the scraper API and the Line reply and push APIs",
+    ["upstream", "endpoint"],
+))
+upstream_errors = registry.register(Counter(
+    "titans_upstream_errors_total",
+    "Failed calls to the scraper API and the Line reply and push APIs",
+    ["upstream", "endpoint", "reason"],
+))
+render_duration = registry.register(Histogram(
+    "titans_render_duration_seconds",
+    "Time to build and serialize a Flex message on a cache miss",
+    ["message"],
+))
+reply_size_ratio = registry.register(Histogram(
+    "titans_reply_size_ratio",
+    "Largest message in a reply as a fraction of Line's 50 KB flex limit",
+    buckets=(0.1, 0.25, 0.5, 0.75, 0.9, 1.0),
+))
+reply_message_count = registry.register(Histogram(
+    "titans_reply_messages",
+    "Messages per reply (Line allows 5)",
+    buckets=(1, 2, 3, 4, 5),
+))
+reply_adjustments = registry.register(Counter(
+    "titans_reply_adjustments_total",
+    "Replies changed to fit Line's limits",
+    ["kind"],
+))
+webhook_events = registry.register(Counter(
+    "titans_webhook_events_total",
+    "Webhook events received",
+    ["type"],
+))
+duplicate_events = registry.register(Counter(
+    "titans_duplicate_events_total",
+    "Webhook events skipped because their webhookEventId was already handled",
+    ["redelivery"],
+))
+events_in_flight = registry.register(Gauge(
+    "titans_events_in_flight",
+    "Webhook events currently being handled",
+))
+event_queue_delay = registry.register(Histogram(
+    "titans_event_queue_delay_seconds",
+    "Time webhook events wait for a free handler slot",
+))
+expired_replies = registry.register(Counter(
+    "titans_expired_replies_total",
+    "Replies whose reply token expired before they were sent, by what happened instead",
+    ["outcome"],
+))
+
+
+def cache_metrics(caches: Dict[str, Dict]) -> List[Metric]:
+    """Hit/miss counters and hit ratios from caches' stats() dictionaries."""
+    hits = Counter("titans_cache_hits_total", "Cache lookups served from memory (including stale hits)", ["cache"])
+    misses = Counter("titans_cache_misses_total", "Cache lookups that had to fetch or render", ["cache"])
+    ratio = Gauge("titans_cache_hit_ratio", "Cache hits / lookups since start", ["cache"])
+    for name, stats in caches.items():
+        hit_count = stats.get("hits", 0) + stats.get("stale_hits", 0)
+        miss_count = stats.get("misses", 0)
+        hits.inc(name, amount=hit_count)
+        misses.inc(name, amount=miss_count)
+        if hit_count + miss_count:
+            ratio.set(hit_count / (hit_count + miss_count), name)
+    return [hits, misses, ratio]
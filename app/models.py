@@ -0,0 +1,145 @@
+import logging
+import sys
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHECK_IN_URL = "https://untappd.com"
+
+
+def trim_string(s: str, max_length: int = 40) -> str:
+    """Trim string and add ellipsis if too long."""
+    s = s.replace("\r", " ").replace("\n", " ")
+    if len(s) > max_length:
+        return s[: max_length - 3] + "..."
+    return s
+
+
+def _text(value: Any) -> str:
+    """Coerce an upstream field to a stripped string (None becomes "")."""
+    if value is None:
+        return ""
+    return value.strip() if isinstance(value, str) else str(value)
+
+
+class Beer:
+    """
+    One beer, either on the tap list or saved by a user.
+    Decoded once from the scraper API's JSON; brewery and style are interned
+    since the same few values repeat across the menu, and the display fields
+    the carousels use are computed up front.
+    Saved beers also carry their database `id` (or a write-behind placeholder)
+    and `saved_at`.
+    """
+
+    __slots__ = (
+        "name", "brewery", "style", "abv", "rating", "label", "check_in",
+        "id", "saved_at", "title", "short_title",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        brewery: str = "",
+        style: str = "",
+        abv: str = "",
+        rating: str = "",
+        label: str = "",
+        check_in: str = "",
+        id: Any = None,
+        saved_at: str = "",
+    ):
+        self.name = name
+        self.brewery = sys.intern(brewery)
+        self.style = sys.intern(style)
+        self.abv = abv
+        self.rating = rating
+        self.label = label
+        self.check_in = check_in
+        self.id = id
+        self.saved_at = saved_at
+        self.title = trim_string(name)
+        self.short_title = trim_string(name, 20)
+
+    @classmethod
+    def from_api(cls, data: Dict[str, Any]) -> Optional["Beer"]:
+        """Decode a tap list entry (or save postback); None if it has no name."""
+        name = _text(data.get("name"))
+        if not name:
+            return None
+        return cls(
+            name,
+            _text(data.get("brewery")),
+            _text(data.get("style")),
+            _text(data.get("abv")),
+            _text(data.get("rating")),
+            _text(data.get("label")),
+            _text(data.get("check_in")),
+        )
+
+    @classmethod
+    def from_saved(cls, row: Dict[str, Any]) -> Optional["Beer"]:
+        """Decode a /mybeers row; None if it has no name."""
+        name = _text(row.get("beer_name"))
+        if not name:
+            return None
+        return cls(
+            name,
+            _text(row.get("brewery")),
+            _text(row.get("style")),
+            _text(row.get("abv")),
+            _text(row.get("rating")),
+            _text(row.get("label")),
+            id=row.get("id"),
+            saved_at=_text(row.get("saved_at")),
+        )
+
+    def to_api(self) -> Dict[str, str]:
+        """Encode in the scraper API's tap list schema."""
+        return {
+            "name": self.name,
+            "brewery": self.brewery,
+            "style": self.style,
+            "abv": self.abv,
+            "label": self.label,
+            "rating": self.rating,
+            "check_in": self.check_in,
+        }
+
+    def to_saved(self) -> Dict[str, Any]:
+        """Encode as a /save (or /bulk) payload."""
+        return {
+            "beer_name": self.name,
+            "brewery": self.brewery,
+            "style": self.style,
+            "abv": self.abv,
+            "rating": self.rating,
+            "label": self.label,
+        }
+
+    def saved_as(self, id: Any, saved_at: str) -> "Beer":
+        """A copy of this beer with a saved id and timestamp."""
+        return Beer(
+            self.name, self.brewery, self.style, self.abv, self.rating,
+            self.label, self.check_in, id, saved_at,
+        )
+
+    def __repr__(self) -> str:
+        return f"Beer({self.name!r}, {self.brewery!r}, id={self.id!r})"
+
+
+def decode_menu(data: Any) -> List[Beer]:
+    """Decode the scraper API's tap list, dropping malformed entries."""
+    if not isinstance(data, list):
+        raise ValueError(f"Expected a list of beers, got {type(data).__name__}")
+    beers = [Beer.from_api(item) for item in data if isinstance(item, dict)]
+    valid = [beer for beer in beers if beer is not None]
+    if len(valid) != len(data):
+        logger.warning("Dropped %d malformed beers from the tap list", len(data) - len(valid))
+    return valid
+
+
+def decode_saved(rows: Any) -> List[Beer]:
+    """Decode a /mybeers page, dropping malformed rows."""
+    beers = [Beer.from_saved(row) for row in rows or [] if isinstance(row, dict)]
+    return [beer for beer in beers if beer is not None]
@@ -0,0 +1,150 @@
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, List, Tuple
+
+from .menu_search import parse_number
+from .models import Beer
+
+if TYPE_CHECKING:
+    import numpy
+
+# Weight of each feature block in a beer's score
+STYLE_WEIGHT = 1.0
+FAMILY_WEIGHT = 0.6
+BREWERY_WEIGHT = 0.5
+ABV_WEIGHT = 0.4
+# Small enough to only break ties between equally similar beers
+RATING_WEIGHT = 0.05
+
+# Upper bounds (ABV %) of the strength bins; a last bin holds anything stronger
+ABV_BIN_EDGES = (4.0, 5.0, 6.0, 7.0, 8.5, 10.0)
+# Share of a saved beer's ABV bin credited to the bins either side of it
+ABV_NEIGHBOUR_SHARE = 0.5
+
+# Menu versions whose feature matrix is kept (the current one, plus a few spares)
+FEATURES_CACHE_SIZE = 4
+
+
+def style_family(style: str) -> str:
+    """Broad style: "IPA - New England / Hazy" -> "ipa"."""
+    return style.split(" - ", 1)[0].strip().lower()
+
+
+def beer_key(beer: Beer) -> Tuple[str, str]:
+    """Identifies a beer across the menu and saved lists, which don't share IDs."""
+    return beer.name.lower(), beer.brewery.lower()
+
+
+def abv_bin(abv: str) -> int:
+    """Strength bin of an ABV string, or -1 when it has no number."""
+    value = parse_number(abv)
+    if value is None:
+        return -1
+    for index, edge in enumerate(ABV_BIN_EDGES):
+        if value < edge:
+            return index
+    return len(ABV_BIN_EDGES)
+
+
+class MenuFeatures:
+    """
+    Feature matrix of one menu version, built once when the version is first used.
+    Each row is a beer: one-hot columns for its style, style family, brewery and
+    ABV bin, each scaled by its block weight, plus its rating. A user's profile
+    is a vector over the same columns, so scoring the whole menu is `matrix @ profile`.
+    numpy is imported here rather than at module load, keeping it out of cold start.
+    """
+
+    def __init__(self, beers: List[Beer]):
+        import numpy as np
+
+        self.size = len(beers)
+        self.rows: Dict[Tuple[str, str], List[int]] = {}
+        for row, beer in enumerate(beers):
+            self.rows.setdefault(beer_key(beer), []).append(row)
+        self.columns: Dict[Tuple[str, str], int] = {}
+        for beer in beers:
+            for feature in self.features(beer):
+                self.columns.setdefault(feature, len(self.columns))
+        self.abv_offset = len(self.columns)
+        self.rating_column = self.abv_offset + len(ABV_BIN_EDGES) + 1
+
+        weights = {"style": STYLE_WEIGHT, "family": FAMILY_WEIGHT, "brewery": BREWERY_WEIGHT}
+        matrix = np.zeros((self.size, self.rating_column + 1), dtype=np.float32)
+        for row, beer in enumerate(beers):
+            for feature in self.features(beer):
+                matrix[row, self.columns[feature]] = weights[feature[0]]
+            strength = abv_bin(beer.abv)
+            if strength >= 0:
+                matrix[row, self.abv_offset + strength] = ABV_WEIGHT
+            rating = parse_number(beer.rating)
+            if rating is not None:
+                matrix[row, self.rating_column] = RATING_WEIGHT * min(rating, 5.0) / 5.0
+        self.matrix = matrix
+
+    @staticmethod
+    def features(beer: Beer) -> List[Tuple[str, str]]:
+        features = []
+        if beer.style:
+            features.append(("style", beer.style.lower()))
+            features.append(("family", style_family(beer.style)))
+        if beer.brewery:
+            features.append(("brewery", beer.brewery.lower()))
+        return features
+
+    def profile(self, saved: List[Beer]) -> "numpy.ndarray":
+        """
+        A user's taste over this menu's columns: for each style, family and
+        brewery, the share of their saved beers that have it (features nothing
+        on tap has are dropped), and a smoothed histogram of their ABV bins.
+        """
+        import numpy as np
+
+        profile = np.zeros(self.matrix.shape[1], dtype=np.float32)
+        if not saved:
+            return profile
+        share = 1.0 / len(saved)
+        last_bin = len(ABV_BIN_EDGES)
+        for beer in saved:
+            for feature in self.features(beer):
+                column = self.columns.get(feature)
+                if column is not None:
+                    profile[column] += share
+            strength = abv_bin(beer.abv)
+            if strength >= 0:
+                profile[self.abv_offset + strength] += share
+                if strength > 0:
+                    profile[self.abv_offset + strength - 1] += share * ABV_NEIGHBOUR_SHARE
+                if strength < last_bin:
+                    profile[self.abv_offset + strength + 1] += share * ABV_NEIGHBOUR_SHARE
+        profile[self.rating_column] = 1.0
+        return profile
+
+    def recommend(self, saved: List[Beer], count: int) -> List[int]:
+        """Indices of the `count` best matches on tap, best first, leaving out beers already saved."""
+        import numpy as np
+
+        scores = self.matrix @ self.profile(saved)
+        for beer in saved:
+            scores[self.rows.get(beer_key(beer), [])] = -np.inf
+
+        candidates = int(np.isfinite(scores).sum())
+        count = min(count, candidates)
+        if count <= 0:
+            return []
+        top = np.argpartition(-scores, count - 1)[:count]
+        return [int(index) for index in top[np.argsort(-scores[top], kind="stable")]]
+
+
+_features: "OrderedDict[str, MenuFeatures]" = OrderedDict()
+
+
+def menu_features(beers: List[Beer], version: str) -> MenuFeatures:
+    """Return the feature matrix of a menu version, building it on first use."""
+    features = _features.get(version)
+    if features is None:
+        features = _features[version] = MenuFeatures(beers)
+        while len(_features) > FEATURES_CACHE_SIZE:
+            _features.popitem(last=False)
+    else:
+        _features.move_to_end(version)
+    return features
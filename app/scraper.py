@@ -1,29 +1,282 @@
-import requests
-from typing import List, Dict
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
 
-# Oracle Cloud scraper API
-SCRAPER_API_URL = "http://140.238.197.186:5000"
+from .config import (
+    SCRAPE_TIMEOUT,
+    MENU_CACHE_TTL,
+    MENU_REFRESH_INTERVAL,
+    MENU_HISTORY_SIZE,
+    SHARED_MENU_PATH,
+    SHARED_MENU_POLL_INTERVAL,
+    MENU_SNAPSHOT_PATH,
+)
+from .http_client import scraper_request
+from .models import Beer, decode_menu
+from .shared_snapshot import SharedMenuSnapshot
 
+logger = logging.getLogger(__name__)
 
-def scrape_beers() -> List[Dict[str, str]]:
+
+async def fetch_menu(etag: str = "") -> Tuple[Optional[List[Beer]], str]:
     """
-    Fetch beer information from Oracle Cloud scraper API.
-    Returns a list of beer dictionaries.
+    Conditionally fetch the tap list from Oracle Cloud scraper API.
+    Returns (beers, etag); beers is None when the API answers 304 Not Modified.
+    Raises on upstream errors.
     """
-    try:
-        response = requests.get(SCRAPER_API_URL, timeout=30)
-        response.raise_for_status()
-        beers = response.json()
-        print(f"Successfully fetched {len(beers)} beers from scraper API")
-        return beers
-    except Exception as e:
-        print(f"Error fetching from scraper API: {e}")
-        return []
-
-
-def trim_string(s: str, max_length: int = 40) -> str:
-    """Trim string and add ellipsis if too long."""
-    s = s.replace("\r", " ").replace("\n", " ")
-    if len(s) > max_length:
-        return s[: max_length - 3] + "..."
-    return s
+    headers = {"If-None-Match": etag} if etag else {}
+    response = await scraper_request("GET", "/", timeout=SCRAPE_TIMEOUT, headers=headers)
+    if response.status_code == 304:
+        return None, etag
+    return decode_menu(response.json()), response.headers.get("ETag", "")
+
+
+def menu_hash(beers: List[Beer]) -> str:
+    """Content hash of a tap list, used as the menu version."""
+    canonical = json.dumps([beer.to_api() for beer in beers], sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.blake2b(canonical.encode("utf-8"), digest_size=8).hexdigest()
+
+
+class MenuSnapshot:
+    """An immutable tap list as fetched at a point in time."""
+
+    __slots__ = ("beers", "version", "etag", "fetched_at")
+
+    def __init__(self, beers: List[Beer], version: str, fetched_at: float, etag: str = ""):
+        self.beers = beers
+        self.version = version
+        self.etag = etag
+        self.fetched_at = fetched_at
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.fetched_at
+
+
+class MenuCache:
+    """
+    Tap list cache with stale-while-revalidate serving.
+    Concurrent misses share a single upstream fetch, and a background task
+    keeps the snapshot warm so most requests never wait on the scraper API.
+    The last few menu versions are retained so postbacks from carousels sent
+    earlier can still be resolved.
+    With a `shared` snapshot, only the leading worker fetches from the scraper
+    API; the others adopt what it publishes. Otherwise each refresh is written
+    to `store`, so a restarted process can serve the last good menu at once.
+    """
+
+    def __init__(
+        self,
+        ttl: float = MENU_CACHE_TTL,
+        refresh_interval: float = MENU_REFRESH_INTERVAL,
+        history_size: int = MENU_HISTORY_SIZE,
+        shared: Optional[SharedMenuSnapshot] = None,
+        shared_poll_interval: float = SHARED_MENU_POLL_INTERVAL,
+        store: Optional[SharedMenuSnapshot] = None,
+    ):
+        self.ttl = ttl
+        self.refresh_interval = refresh_interval
+        self.history_size = history_size
+        self.shared = shared
+        self.shared_poll_interval = shared_poll_interval
+        self.store = store
+        self._shared_checked_at = 0.0
+        self.snapshot: Optional[MenuSnapshot] = None
+        self._history: "OrderedDict[str, MenuSnapshot]" = OrderedDict()
+        self._inflight: Optional[asyncio.Task] = None
+        self._refresher: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.not_modified = 0
+        self.refresh_failures = 0
+
+    async def get(self) -> List[Beer]:
+        """Return the current tap list, fetching it only if nothing is cached."""
+        snapshot = await self.get_snapshot()
+        return snapshot.beers if snapshot else []
+
+    async def get_snapshot(self) -> Optional[MenuSnapshot]:
+        """Return the current snapshot, fetching it only if nothing is cached."""
+        if self.shared is not None and not self.shared.is_leader:
+            self._poll_shared()
+        snapshot = self.snapshot
+        if snapshot is None:
+            self.misses += 1
+            return await self.refresh()
+
+        if snapshot.age <= self.ttl:
+            self.hits += 1
+        else:
+            # Serve the stale list now and revalidate in the background
+            self.stale_hits += 1
+            self._start_refresh()
+        return snapshot
+
+    def snapshot_for(self, version: str) -> Optional[MenuSnapshot]:
+        """Return the retained snapshot of a menu version, if it is still known."""
+        snapshot = self._history.get(version)
+        if snapshot is None and self.shared is not None and not self.shared.is_leader:
+            # A carousel the leader rendered from a version this worker hasn't adopted yet
+            self._poll_shared(force=True)
+            snapshot = self._history.get(version)
+        return snapshot
+
+    def _publish(self, snapshot: MenuSnapshot, persist: bool = True) -> MenuSnapshot:
+        self.snapshot = snapshot
+        self._history[snapshot.version] = snapshot
+        self._history.move_to_end(snapshot.version)
+        while len(self._history) > self.history_size:
+            self._history.popitem(last=False)
+        if persist:
+            self._persist(snapshot)
+        return snapshot
+
+    def _persist(self, snapshot: MenuSnapshot) -> None:
+        if self.shared is not None:
+            if self.shared.is_leader:
+                self.shared.publish(snapshot.beers, snapshot.version, snapshot.age, snapshot.etag)
+        elif self.store is not None:
+            self.store.publish(snapshot.beers, snapshot.version, snapshot.age, snapshot.etag)
+
+    def load_snapshot(self) -> bool:
+        """
+        Serve the tap list last written to disk until the first refresh (called on boot).
+        An old snapshot is served as stale while the refresher revalidates it.
+        Returns whether a snapshot was loaded.
+        """
+        target = self.shared if self.shared is not None else self.store
+        if target is self.store and target is not None and target.path.startswith("/tmp/"):
+            logger.warning(
+                "Menu snapshot %s is under /tmp, which a redeploy wipes; "
+                "set MENU_SNAPSHOT_PATH to a persistent disk to serve the last menu on boot",
+                target.path,
+            )
+        published = target.read() if target is not None else None
+        if published is None or not published[0]:
+            return False
+        beers, version, fetched_at, etag = published
+        snapshot = self._publish(MenuSnapshot(beers, version, fetched_at, etag), persist=False)
+        logger.info(
+            "Loaded %d beers from %s", len(beers), target.path,
+            extra={"menu_version": version, "age": round(snapshot.age)},
+        )
+        return True
+
+    def _poll_shared(self, force: bool = False) -> None:
+        """Adopt the leader's snapshot if it changed (checked at most once per poll interval)."""
+        now = time.monotonic()
+        if not force and now - self._shared_checked_at < self.shared_poll_interval:
+            return
+        self._shared_checked_at = now
+        current = self.snapshot
+        published = self.shared.read(current.version if current else "")
+        if published is None:
+            return
+        beers, version, fetched_at, etag = published
+        if beers is None:
+            beers = current.beers
+        else:
+            logger.info("Adopted shared menu snapshot with %d beers", len(beers), extra={"menu_version": version})
+        self._publish(MenuSnapshot(beers, version, fetched_at, etag))
+
+    async def refresh(self) -> Optional[MenuSnapshot]:
+        """Fetch a fresh tap list, joining any fetch already in flight."""
+        return await asyncio.shield(self._start_refresh())
+
+    def _start_refresh(self) -> asyncio.Task:
+        if self._inflight is None or self._inflight.done():
+            self._inflight = asyncio.create_task(self._fetch())
+        return self._inflight
+
+    async def _fetch(self) -> Optional[MenuSnapshot]:
+        if self.shared is not None and not self.shared.try_lead():
+            # Wait for the leader's first publish rather than fetching alongside it
+            deadline = time.monotonic() + SCRAPE_TIMEOUT
+            while True:
+                self._poll_shared(force=True)
+                if self.snapshot is not None:
+                    return self.snapshot
+                if time.monotonic() >= deadline or self.shared.try_lead():
+                    break
+                await asyncio.sleep(0.1)
+            if not self.shared.is_leader:
+                logger.warning("No shared menu snapshot after %.0fs; fetching for this worker", SCRAPE_TIMEOUT)
+
+        previous = self.snapshot
+        try:
+            beers, etag = await fetch_menu(previous.etag if previous else "")
+        except Exception as e:
+            logger.error("Error fetching from scraper API: %s", e)
+            beers, etag = [], ""
+
+        if beers is None:
+            # Unchanged upstream: keep the decoded list and its rendered carousels
+            self.not_modified += 1
+            return self._publish(MenuSnapshot(previous.beers, previous.version, time.monotonic(), etag))
+        if not beers:
+            # Keep serving the previous snapshot if the upstream fetch failed
+            self.refresh_failures += 1
+            return previous
+        version = menu_hash(beers)
+        logger.info("Fetched %d beers from scraper API", len(beers), extra={"menu_version": version})
+        self.refreshes += 1
+        return self._publish(MenuSnapshot(beers, version, time.monotonic(), etag))
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.exception("Error refreshing menu cache: %s", e)
+            await asyncio.sleep(self.refresh_interval)
+
+    def start(self) -> None:
+        """Start the background refresher (called from the app lifespan)."""
+        if self._refresher is None or self._refresher.done():
+            self._refresher = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        """Stop the background refresher and hand shared refreshes to another worker."""
+        if self._refresher is not None:
+            self._refresher.cancel()
+            try:
+                await self._refresher
+            except asyncio.CancelledError:
+                pass
+            self._refresher = None
+        if self.shared is not None:
+            self.shared.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return cache age and hit/miss counters."""
+        snapshot = self.snapshot
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "ttl": self.ttl,
+            "version": snapshot.version if snapshot else None,
+            "age": round(snapshot.age, 1) if snapshot else None,
+            "count": len(snapshot.beers) if snapshot else 0,
+            "retained_versions": len(self._history),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.hits + self.stale_hits) / lookups, 3) if lookups else None,
+            "refreshes": self.refreshes,
+            "not_modified": self.not_modified,
+            "refresh_failures": self.refresh_failures,
+            "refreshing": self._inflight is not None and not self._inflight.done(),
+            "shared": self.shared.stats() if self.shared is not None else None,
+        }
+
+
+menu_cache = MenuCache(
+    shared=SharedMenuSnapshot(SHARED_MENU_PATH) if SHARED_MENU_PATH else None,
+    store=SharedMenuSnapshot(MENU_SNAPSHOT_PATH) if MENU_SNAPSHOT_PATH and not SHARED_MENU_PATH else None,
+)
+
@@ -0,0 +1,144 @@
+import logging
+import mmap
+import os
+import struct
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import json_codec
+from .models import Beer, decode_menu
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# File layout: header, then the ETag, then the tap list as JSON (API schema)
+MAGIC = b"TBMENU01"
+_HEADER = struct.Struct("<8s32sdII")  # magic, version, fetched_at (wall clock), etag length, payload length
+
+# (inode, mtime, size) of a snapshot file; a new publish always changes the inode
+FileKey = Tuple[int, int, int]
+
+# (beers, version, fetched_at on this process's monotonic clock, etag)
+Published = Tuple[Optional[List[Beer]], str, float, str]
+
+
+class SharedMenuSnapshot:
+    """
+    Menu snapshot shared by the worker processes of one host.
+    The worker holding an exclusive lock on `<path>.lock` is the leader: it
+    fetches the menu and publishes each snapshot by writing a new file and
+    renaming it over `path`. Other workers mmap the file and decode it only
+    when its version changes, so upstream fetches do not grow with workers.
+    If the leader exits, the OS releases its lock and another worker takes over.
+    A single process uses the same file, without the lock, to keep the last
+    good menu across restarts.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock_path = path + ".lock"
+        self._lock_file = None
+        self._file_key: Optional[FileKey] = None
+        self._payload_version = ""
+        self._payload = b""
+        self.publishes = 0
+        self.adopted = 0
+        self.read_errors = 0
+
+    @property
+    def is_leader(self) -> bool:
+        return self._lock_file is not None
+
+    def try_lead(self) -> bool:
+        """Become the leader if no other worker is. Returns whether this worker leads."""
+        if self._lock_file is not None:
+            return True
+        if fcntl is None:
+            # No file locks: every worker fetches for itself
+            return True
+        lock_file = open(self.lock_path, "a+b")
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        logger.info("Leading menu refreshes for shared snapshot %s (pid %d)", self.path, os.getpid())
+        return True
+
+    def release(self) -> None:
+        """Give up leadership (called on shutdown)."""
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    def publish(self, beers: List[Beer], version: str, age: float, etag: str = "") -> None:
+        """Atomically replace the shared file with a snapshot of the tap list."""
+        if version != self._payload_version:
+            self._payload = json_codec.dumps([beer.to_api() for beer in beers])
+            self._payload_version = version
+        raw_etag = etag.encode("utf-8")
+        header = _HEADER.pack(MAGIC, version.encode("ascii"), time.time() - age, len(raw_etag), len(self._payload))
+
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(header)
+                f.write(raw_etag)
+                f.write(self._payload)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning("Could not publish shared menu snapshot to %s: %s", self.path, e)
+            return
+        self.publishes += 1
+
+    def read(self, current_version: str = "") -> Optional[Published]:
+        """
+        Return the published snapshot if the file changed since the last read, else None.
+        Beers are None when the published version is `current_version`: the
+        leader republished an unchanged menu, so only its age is new.
+        """
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        if (stat.st_ino, stat.st_mtime_ns, stat.st_size) == self._file_key:
+            return None
+
+        beers = None
+        try:
+            with open(self.path, "rb") as f:
+                stat = os.fstat(f.fileno())
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    magic, raw_version, fetched_at, etag_len, payload_len = _HEADER.unpack_from(mm, 0)
+                    start = _HEADER.size + etag_len
+                    if magic != MAGIC or start + payload_len != len(mm):
+                        raise ValueError("not a menu snapshot file")
+                    version = raw_version.rstrip(b"\0").decode("ascii")
+                    etag = mm[_HEADER.size:start].decode("utf-8")
+                    if version != current_version:
+                        # Decode straight from the mapping, without reading the file into memory first
+                        with memoryview(mm) as view, view[start:] as payload:
+                            beers = decode_menu(json_codec.loads(payload))
+                        self.adopted += 1
+        except (OSError, ValueError, struct.error) as e:
+            self.read_errors += 1
+            logger.warning("Could not read shared menu snapshot %s: %s", self.path, e)
+            return None
+
+        self._file_key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        age = max(0.0, time.time() - fetched_at)
+        return beers, version, time.monotonic() - age, etag
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "role": "leader" if self.is_leader else "follower",
+            "publishes": self.publishes,
+            "adopted": self.adopted,
+            "read_errors": self.read_errors,
+        }
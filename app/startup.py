@@ -0,0 +1,63 @@
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def process_age() -> Optional[float]:
+    """Seconds since this process was started, or None where /proc is unavailable."""
+    try:
+        with open("/proc/self/stat") as f:
+            # Field 22 (starttime, in clock ticks since boot) counted after the ")" ending the command name
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        return None
+    return uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+
+
+class StartupTimer:
+    """
+    Times the phases of a cold start and reports them once the bot is ready.
+    `boot` covers interpreter start, imports and server setup, up to the app lifespan.
+    """
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+        self.ready = False
+        self._started: Optional[float] = None
+
+    def begin(self) -> None:
+        """Mark the start of the app lifespan."""
+        self._started = time.perf_counter()
+        boot = process_age()
+        if boot is not None:
+            self.phases["boot"] = boot
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - start
+
+    def mark_ready(self, menu_source: str) -> None:
+        """Record readiness (once) and log the startup report."""
+        if self.ready:
+            return
+        self.ready = True
+        if self._started is not None:
+            self.phases["until_ready"] = time.perf_counter() - self._started
+        logger.info("Ready", extra={"menu_source": menu_source, "startup": self.report()})
+
+    def report(self) -> Dict[str, Any]:
+        """Phase durations in milliseconds."""
+        return {name: round(seconds * 1000, 1) for name, seconds in self.phases.items()}
+
+
+startup = StartupTimer()
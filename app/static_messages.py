@@ -0,0 +1,115 @@
+import asyncio
+import logging
+import os
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from .config import STATIC_RELOAD_INTERVAL
+from .flex_messages import (
+    DATA_DIR,
+    Message,
+    serialize_message,
+    build_size_message,
+    build_staff_carousel,
+    build_hagehige_carousel,
+    build_personal_message,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class StaticMessageRegistry:
+    """
+    Pre-serialized messages that only change when their data files do.
+    Messages are built once and served as bytes; a background task checks the
+    data files' mtimes and rebuilds only the messages whose files changed.
+    """
+
+    def __init__(self, reload_interval: float = STATIC_RELOAD_INTERVAL):
+        self.reload_interval = reload_interval
+        self._builders: Dict[str, Tuple[Callable[[], Message], List[str]]] = {}
+        self._messages: Dict[str, bytes] = {}
+        self._mtimes: Dict[str, Optional[float]] = {}
+        self._poller: Optional[asyncio.Task] = None
+        self.reloads = 0
+
+    def register(self, name: str, builder: Callable[[], Message], data_files: Sequence[str] = ()) -> None:
+        """Register a message builder and the data files it reads."""
+        self._builders[name] = (builder, list(data_files))
+
+    def get(self, name: str) -> bytes:
+        """Return a ready-to-send message (no disk I/O once built)."""
+        message = self._messages.get(name)
+        if message is None:
+            message = self._build(name)
+        return message
+
+    def load(self) -> None:
+        """Build every registered message (called at startup)."""
+        for name in self._builders:
+            self._build(name)
+
+    def reload_if_changed(self) -> List[str]:
+        """Rebuild messages whose data files changed; returns their names."""
+        changed = [
+            filename for filename, mtime in self._mtimes.items()
+            if _mtime(filename) != mtime
+        ]
+        if not changed:
+            return []
+
+        reloaded = [
+            name for name, (_, data_files) in self._builders.items()
+            if any(filename in changed for filename in data_files)
+        ]
+        for name in reloaded:
+            self._build(name)
+        self.reloads += len(reloaded)
+        logger.info("Reloaded static messages %s after changes to %s", reloaded, changed)
+        return reloaded
+
+    def _build(self, name: str) -> bytes:
+        builder, data_files = self._builders[name]
+        # Record mtimes before reading so an edit during the build triggers another reload
+        for filename in data_files:
+            self._mtimes[filename] = _mtime(filename)
+        message = serialize_message(builder())
+        self._messages[name] = message
+        return message
+
+    async def _poll_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            try:
+                self.reload_if_changed()
+            except Exception as e:
+                logger.exception("Error reloading static messages: %s", e)
+
+    def start(self) -> None:
+        """Start the mtime poller (called from the app lifespan)."""
+        if self._poller is None or self._poller.done():
+            self._poller = asyncio.create_task(self._poll_loop())
+
+    async def stop(self) -> None:
+        """Stop the mtime poller."""
+        if self._poller is not None:
+            self._poller.cancel()
+            try:
+                await self._poller
+            except asyncio.CancelledError:
+                pass
+            self._poller = None
+
+
+def _mtime(filename: str) -> Optional[float]:
+    try:
+        return os.stat(os.path.join(DATA_DIR, filename)).st_mtime
+    except OSError:
+        return None
+
+
+static_messages = StaticMessageRegistry()
+static_messages.register("size", build_size_message, ["size_images.json"])
+static_messages.register("staff", build_staff_carousel, ["staff.json"])
+static_messages.register("hagehige", build_hagehige_carousel, ["hagehige.json"])
+static_messages.register("yurie", lambda: build_personal_message("yurie"))
+static_messages.register("adam", lambda: build_personal_message("adam"))
@@ -0,0 +1,210 @@
+import logging
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Columns a saved-beer page may return; id and saved_at are always included for the cursor
+SAVED_BEER_COLUMNS = ["id", "beer_name", "brewery", "style", "abv", "rating", "label", "saved_at"]
+
+PRAGMAS = [
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA busy_timeout = 5000",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -4096",
+    "PRAGMA mmap_size = 33554432",
+]
+
+
+def _migrate_v1(conn: sqlite3.Connection) -> None:
+    """Create the table, or add the label column to tables from the original setup script."""
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS saved_beers ("
+        "id INTEGER PRIMARY KEY, user_id TEXT, beer_name TEXT, brewery TEXT, "
+        "style TEXT, abv TEXT, rating TEXT, label TEXT, saved_at TEXT)"
+    )
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(saved_beers)")}
+    if "label" not in columns:
+        conn.execute("ALTER TABLE saved_beers ADD COLUMN label TEXT DEFAULT ''")
+
+
+def _migrate_v2(conn: sqlite3.Connection) -> None:
+    """Drop duplicate saves, then add the uniqueness rule and the listing index."""
+    conn.execute(
+        "DELETE FROM saved_beers WHERE id NOT IN ("
+        "SELECT MIN(id) FROM saved_beers GROUP BY user_id, beer_name, IFNULL(brewery, ''))"
+    )
+    conn.execute("UPDATE saved_beers SET brewery = '' WHERE brewery IS NULL")
+    conn.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_saved_beers_user_beer "
+        "ON saved_beers (user_id, beer_name, brewery)"
+    )
+    # id is the rowid, so this index also covers the keyset tie-breaker
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_saved_beers_user_saved_at "
+        "ON saved_beers (user_id, saved_at)"
+    )
+
+
+MIGRATIONS = [_migrate_v1, _migrate_v2]
+
+
+def encode_cursor(row: Dict[str, Any]) -> str:
+    return f"{row['saved_at']}|{row['id']}"
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    saved_at, _, beer_id = cursor.rpartition("|")
+    return saved_at, int(beer_id)
+
+
+def with_transaction(conn: sqlite3.Connection, apply: Callable[[], None]) -> None:
+    """Run `apply` inside an immediate transaction on an autocommit connection."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        apply()
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+class SavedBeerStore:
+    """
+    SQLite storage for saved beers.
+    Each worker thread reuses one connection configured for WAL; the schema is
+    migrated on first use, tracked with PRAGMA user_version.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._migrate_lock = threading.Lock()
+        self._migrated = False
+
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            for pragma in PRAGMAS:
+                conn.execute(pragma)
+            self._local.conn = conn
+        if not self._migrated:
+            self.migrate()
+        return conn
+
+    def migrate(self) -> int:
+        """Apply pending schema migrations; returns the schema version."""
+        with self._migrate_lock:
+            conn = getattr(self._local, "conn", None) or sqlite3.connect(self.path, isolation_level=None)
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            for target, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    migration(conn)
+                    conn.execute(f"PRAGMA user_version = {target}")
+                    conn.execute("COMMIT")
+                except Exception:
+                    conn.execute("ROLLBACK")
+                    raise
+                logger.info("Migrated %s to schema version %d", self.path, target)
+                version = target
+            if conn is not getattr(self._local, "conn", None):
+                conn.close()
+            self._migrated = True
+            return version
+
+    def save(self, user_id: str, beer: Dict[str, Any]) -> Dict[str, Any]:
+        """Save a beer; saving the same beer again returns the existing row."""
+        conn = self.connection()
+        with_transaction(conn, lambda: self._insert(conn, user_id, beer))
+        return self._find(conn, user_id, beer)
+
+    def delete(self, user_id: str, beer_id: Any) -> None:
+        conn = self.connection()
+        conn.execute("DELETE FROM saved_beers WHERE id = ? AND user_id = ?", (beer_id, user_id))
+
+    def bulk(self, saves: Sequence[Dict[str, Any]], deletes: Sequence[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """Apply deletes and saves in one transaction; returns saved rows keyed by `ref`."""
+        conn = self.connection()
+        saved: Dict[str, Dict[str, Any]] = {}
+
+        def apply() -> None:
+            conn.executemany(
+                "DELETE FROM saved_beers WHERE id = ? AND user_id = ?",
+                [(delete.get("id"), delete.get("user_id")) for delete in deletes],
+            )
+            for save in saves:
+                self._insert(conn, save.get("user_id"), save)
+                saved[save.get("ref")] = self._find(conn, save.get("user_id"), save)
+
+        with_transaction(conn, apply)
+        return saved
+
+    def list_all(self, user_id: str) -> List[Dict[str, Any]]:
+        """Every saved beer for a user, newest first."""
+        cursor = self.connection().execute(
+            "SELECT * FROM saved_beers WHERE user_id = ? ORDER BY saved_at DESC, id DESC",
+            (user_id,),
+        )
+        return [dict(row) for row in cursor]
+
+    def page(
+        self,
+        user_id: str,
+        limit: int,
+        after: Optional[str] = None,
+        columns: Sequence[str] = SAVED_BEER_COLUMNS,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        One page of saved beers, newest first, resuming strictly after `after`.
+        Returns the rows and the cursor for the next page (None on the last page).
+        Raises ValueError for a malformed cursor.
+        """
+        wanted = set(columns) | {"id", "saved_at"}
+        selected = [column for column in SAVED_BEER_COLUMNS if column in wanted]
+
+        where = "user_id = ?"
+        params: List[Any] = [user_id]
+        if after:
+            saved_at, beer_id = decode_cursor(after)
+            where += " AND (saved_at < ? OR (saved_at = ? AND id < ?))"
+            params += [saved_at, saved_at, beer_id]
+
+        rows = self.connection().execute(
+            f"SELECT {', '.join(selected)} FROM saved_beers WHERE {where} "
+            "ORDER BY saved_at DESC, id DESC LIMIT ?",
+            params + [limit + 1],
+        ).fetchall()
+
+        next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+        return [dict(row) for row in rows[:limit]], next_cursor
+
+    def _insert(self, conn: sqlite3.Connection, user_id: str, beer: Dict[str, Any]) -> None:
+        conn.execute(
+            "INSERT OR IGNORE INTO saved_beers "
+            "(user_id, beer_name, brewery, style, abv, rating, label, saved_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                user_id,
+                beer.get("beer_name"),
+                beer.get("brewery") or "",
+                beer.get("style", ""),
+                beer.get("abv", ""),
+                beer.get("rating", ""),
+                beer.get("label", ""),
+                datetime.now().isoformat(),
+            ),
+        )
+
+    def _find(self, conn: sqlite3.Connection, user_id: str, beer: Dict[str, Any]) -> Dict[str, Any]:
+        row = conn.execute(
+            "SELECT id, saved_at FROM saved_beers WHERE user_id = ? AND beer_name = ? AND brewery = ?",
+            (user_id, beer.get("beer_name"), beer.get("brewery") or ""),
+        ).fetchone()
+        return dict(row) if row else {}
+
@@ -0,0 +1,326 @@
+import asyncio
+import json
+import logging
+import os
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+
+from .config import (
+    WRITE_BEHIND_INTERVAL,
+    WRITE_BEHIND_BATCH_SIZE,
+    WRITE_BEHIND_SPOOL_PATH,
+)
+from .http_client import scraper_request
+
+logger = logging.getLogger(__name__)
+
+PENDING_PREFIX = "p"
+RESOLVED_IDS_SIZE = 1000
+
+# Outcomes of WriteBehindQueue.delete()
+DELETE_QUEUED = "queued"
+DELETE_NOT_OWNER = "not_owner"
+DELETE_UNKNOWN = "unknown"
+
+
+def save_key(save: Dict[str, Any]) -> Tuple[str, str, str]:
+    """A queued save's identity, matching the API's uniqueness rule."""
+    return save["user_id"], save.get("beer_name", ""), save.get("brewery", "")
+
+
+def is_pending_id(beer_id: Any) -> bool:
+    """Whether a saved-beer id is a local placeholder for an unflushed save."""
+    return isinstance(beer_id, str) and beer_id.startswith(PENDING_PREFIX)
+
+
+class WriteBehindQueue:
+    """
+    Coalescing write-behind queue for save/delete postbacks.
+    Users are acknowledged immediately; pending writes are flushed in batches
+    to the scraper API's /bulk endpoint, which applies them in one transaction.
+    Saves get a placeholder id until flushed, so deleting a beer that was
+    never flushed cancels both writes without calling the VM.
+    """
+
+    def __init__(
+        self,
+        interval: float = WRITE_BEHIND_INTERVAL,
+        batch_size: int = WRITE_BEHIND_BATCH_SIZE,
+        spool_path: str = WRITE_BEHIND_SPOOL_PATH,
+        on_saved: Optional[Callable[[str, str, int, str], None]] = None,
+    ):
+        self.interval = interval
+        self.batch_size = max(1, batch_size)
+        self.spool_path = spool_path
+        self.on_saved = on_saved
+        self._saves: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._save_keys: Dict[Tuple[str, str, str], str] = {}
+        self._deletes: "OrderedDict[Tuple[str, Any], Dict[str, Any]]" = OrderedDict()
+        self._inflight: Dict[str, Dict[str, Any]] = {}
+        self._cancel_after_flush: Set[str] = set()
+        self._resolved: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = asyncio.Lock()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self.coalesced = 0
+        self.cancelled = 0
+        self.flushes = 0
+        self.flushed_ops = 0
+        self.flush_failures = 0
+
+    def save(self, user_id: str, beer: Dict[str, Any]) -> Dict[str, Any]:
+        """Queue a save; returns the beer with its placeholder id."""
+        key = (user_id, beer.get("beer_name", ""), beer.get("brewery", ""))
+        ref = self._save_keys.get(key)
+        if ref is not None:
+            # Double tap on "Save" before the first one was flushed
+            self.coalesced += 1
+            return self._saves[ref]
+
+        ref = PENDING_PREFIX + uuid.uuid4().hex[:12]
+        pending = {**beer, "id": ref, "user_id": user_id}
+        self._saves[ref] = pending
+        self._save_keys[key] = ref
+        self._notify()
+        return pending
+
+    def delete(self, user_id: str, beer_id: Any) -> str:
+        """
+        Queue a delete, cancelling the matching save if it is still pending.
+        Returns DELETE_NOT_OWNER if the pending save belongs to another user
+        (e.g. a "my beers" carousel tapped by someone else in a group chat; the
+        scraper API checks ownership of flushed saves itself), and DELETE_UNKNOWN
+        for a placeholder id this process no longer knows (after a restart, or
+        once it has dropped out of the resolved ids).
+        """
+        if is_pending_id(beer_id):
+            if beer_id in self._saves:
+                pending = self._saves[beer_id]
+                if pending["user_id"] != user_id:
+                    return DELETE_NOT_OWNER
+                del self._saves[beer_id]
+                del self._save_keys[save_key(pending)]
+                self.cancelled += 1
+                return DELETE_QUEUED
+            if beer_id in self._inflight:
+                if self._inflight[beer_id]["user_id"] != user_id:
+                    return DELETE_NOT_OWNER
+                self._cancel_after_flush.add(beer_id)
+                return DELETE_QUEUED
+            if beer_id not in self._resolved:
+                return DELETE_UNKNOWN
+            beer_id = self._resolved[beer_id]
+
+        if (user_id, beer_id) in self._deletes:
+            self.coalesced += 1
+            return DELETE_QUEUED
+        self._deletes[(user_id, beer_id)] = {"id": beer_id, "user_id": user_id}
+        self._notify()
+        return DELETE_QUEUED
+
+    def resolved_id(self, beer_id: Any) -> Any:
+        """Map a flushed placeholder id to its database id (other ids pass through)."""
+        return self._resolved.get(beer_id, beer_id) if is_pending_id(beer_id) else beer_id
+
+    def has_pending(self, user_id: str) -> bool:
+        """Whether the user has writes the scraper API hasn't seen yet."""
+        return (
+            any(save["user_id"] == user_id for save in self._saves.values())
+            or any(key[0] == user_id for key in self._deletes)
+            or any(save["user_id"] == user_id for save in self._inflight.values())
+        )
+
+    def pending_count(self) -> int:
+        return len(self._saves) + len(self._deletes)
+
+    def _notify(self) -> None:
+        if self._wakeup is not None and self.pending_count() >= self.batch_size:
+            self._wakeup.set()
+
+    async def flush(self) -> bool:
+        """Send all pending writes, at most `batch_size` per request; returns False if a batch failed."""
+        async with self._lock:
+            while self._saves or self._deletes:
+                if not await self._flush_batch():
+                    return False
+            self._remove_spool()
+            return True
+
+    async def _flush_batch(self) -> bool:
+        # Deletes go first, as within one /bulk request, so a beer deleted and
+        # saved again is never deleted after its new save
+        deletes: "OrderedDict[Tuple[str, Any], Dict[str, Any]]" = OrderedDict()
+        while self._deletes and len(deletes) < self.batch_size:
+            key, delete = self._deletes.popitem(last=False)
+            deletes[key] = delete
+        saves: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        while self._saves and len(deletes) + len(saves) < self.batch_size:
+            ref, save = self._saves.popitem(last=False)
+            del self._save_keys[save_key(save)]
+            saves[ref] = save
+        self._inflight = saves
+        payload = {
+            "saves": [{**save, "ref": ref} for ref, save in saves.items()],
+            "deletes": list(deletes.values()),
+        }
+
+        try:
+            response = await scraper_request("POST", "/bulk", json=payload)
+            saved = response.json().get("saved", {})
+        except Exception as e:
+            logger.error("Error flushing %d saves and %d deletes: %s", len(saves), len(deletes), e)
+            self.flush_failures += 1
+            self._requeue(saves, deletes)
+            return False
+        except BaseException:
+            # Cancelled mid-flush (e.g. on shutdown): keep the batch for close()
+            self._requeue(saves, deletes)
+            raise
+        finally:
+            self._inflight = {}
+
+        self.flushes += 1
+        self.flushed_ops += len(saves) + len(deletes)
+        for ref, row in saved.items():
+            if ref not in saves:
+                logger.warning("Ignoring unknown save ref %r in /bulk response", ref)
+                continue
+            self._resolve(ref, saves[ref]["user_id"], row)
+        return True
+
+    def _resolve(self, ref: str, user_id: str, row: Dict[str, Any]) -> None:
+        beer_id = row.get("id")
+        self._resolved[ref] = beer_id
+        while len(self._resolved) > RESOLVED_IDS_SIZE:
+            self._resolved.popitem(last=False)
+        if self.on_saved is not None:
+            self.on_saved(user_id, ref, beer_id, row.get("saved_at", ""))
+        if ref in self._cancel_after_flush:
+            self._cancel_after_flush.discard(ref)
+            self.delete(user_id, beer_id)
+
+    def _requeue(
+        self,
+        saves: "OrderedDict[str, Dict[str, Any]]",
+        deletes: "OrderedDict[Tuple[str, Any], Dict[str, Any]]",
+    ) -> None:
+        """Put a failed batch back ahead of anything queued while it was in flight."""
+        for ref in list(saves):
+            if ref in self._cancel_after_flush:
+                self._cancel_after_flush.discard(ref)
+                del saves[ref]
+                self.cancelled += 1
+        saves.update(self._saves)
+        deletes.update(self._deletes)
+        self._saves, self._deletes = saves, deletes
+        self._save_keys = {save_key(save): ref for ref, save in saves.items()}
+
+    async def _flush_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.exception("Error flushing write-behind queue: %s", e)
+
+    def start(self) -> None:
+        """Load any spooled writes and start the flusher (called from the app lifespan)."""
+        if self.spool_path.startswith("/tmp/"):
+            logger.warning(
+                "Write spool %s is under /tmp, which a redeploy wipes; "
+                "set WRITE_BEHIND_SPOOL_PATH to a persistent disk to keep unflushed saves",
+                self.spool_path,
+            )
+        self._load_spool()
+        self._wakeup = asyncio.Event()
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def close(self) -> None:
+        """Stop the flusher and flush; spool to disk whatever could not be sent."""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        if not await self.flush():
+            self._write_spool()
+
+    def _write_spool(self) -> None:
+        if not self.spool_path:
+            logger.warning("Dropping %d unflushed writes (no spool path)", self.pending_count())
+            return
+        payload = {
+            "saves": list(self._saves.values()),
+            "deletes": list(self._deletes.values()),
+        }
+        tmp_path = f"{self.spool_path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(payload, f, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.spool_path)
+        except OSError as e:
+            logger.error(
+                "Dropping %d unflushed writes: could not spool them to %s: %s",
+                self.pending_count(), self.spool_path, e,
+            )
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return
+        logger.warning("Spooled %d unflushed writes to %s", self.pending_count(), self.spool_path)
+
+    def _load_spool(self) -> None:
+        if not self.spool_path or not os.path.exists(self.spool_path):
+            return
+        try:
+            with open(self.spool_path, "r", encoding="utf-8") as f:
+                payload = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.error("Error loading write spool %s: %s", self.spool_path, e)
+            return
+        if not isinstance(payload, dict):
+            logger.error("Error loading write spool %s: not a JSON object", self.spool_path)
+            return
+        skipped = 0
+        for save in payload.get("saves") or []:
+            if not isinstance(save, dict) or not is_pending_id(save.get("id")) or "user_id" not in save:
+                skipped += 1
+                continue
+            ref = save["id"]
+            self._saves[ref] = save
+            self._save_keys[save_key(save)] = ref
+        for delete in payload.get("deletes") or []:
+            if not isinstance(delete, dict) or "user_id" not in delete or "id" not in delete:
+                skipped += 1
+                continue
+            self._deletes[(delete["user_id"], delete["id"])] = delete
+        if skipped:
+            logger.warning("Skipped %d malformed writes in write spool %s", skipped, self.spool_path)
+        logger.info("Loaded %d spooled writes from %s", self.pending_count(), self.spool_path)
+
+    def _remove_spool(self) -> None:
+        if self.spool_path and os.path.exists(self.spool_path):
+            os.remove(self.spool_path)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending_saves": len(self._saves),
+            "pending_deletes": len(self._deletes),
+            "inflight": len(self._inflight),
+            "coalesced": self.coalesced,
+            "cancelled": self.cancelled,
+            "flushes": self.flushes,
+            "flushed_ops": self.flushed_ops,
+            "flush_failures": self.flush_failures,
+        }
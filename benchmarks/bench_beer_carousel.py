@@ -0,0 +1,174 @@
+"""
+Compare building the beer carousel per request against the cached render.
+The baseline is the original full-menu build, kept here since the app now
+only builds one page at a time.
+
+Run from the repository root:
+    python -m benchmarks.bench_beer_carousel
+"""
+import json
+import timeit
+from typing import Any, Dict, List
+
+from app.flex_messages import build_beer_carousel, render_beer_carousel
+from app.line_handler import build_reply_payload
+from app.models import decode_menu, trim_string
+from app.scraper import menu_hash
+
+from .common import make_menu, report
+
+LOOPS = 2000
+
+
+def original_carousel(beers: List[Dict[str, str]]) -> Dict[str, Any]:
+    """The carousel as built before caching: every beer, with the beer embedded in each Save button."""
+    bubbles = []
+
+    for beer in beers:
+        # Create postback data for saving beer
+        save_data = json.dumps({
+            "action": "save_beer",
+            "name": beer.get("name", ""),
+            "brewery": beer.get("brewery", ""),
+            "style": beer.get("style", ""),
+            "abv": beer.get("abv", ""),
+            "rating": beer.get("rating", ""),
+            "label": beer.get("label", ""),
+        })
+
+        bubble = {
+            "type": "bubble",
+            "size": "kilo",
+            "hero": {
+                "type": "image",
+                "url": beer.get("label", ""),
+                "size": "full",
+                "aspectMode": "cover",
+            },
+            "body": {
+                "type": "box",
+                "layout": "vertical",
+                "contents": [
+                    {
+                        "type": "text",
+                        "text": trim_string(beer.get("name", "Unknown")),
+                        "weight": "bold",
+                        "size": "lg",
+                        "wrap": True,
+                    },
+                    {
+                        "type": "box",
+                        "layout": "vertical",
+                        "contents": [
+                            {
+                                "type": "box",
+                                "layout": "baseline",
+                                "spacing": "sm",
+                                "contents": [
+                                    {
+                                        "type": "text",
+                                        "text": beer.get("brewery", ""),
+                                        "wrap": True,
+                                        "color": "#8c8c8c",
+                                        "size": "md",
+                                        "flex": 5,
+                                    }
+                                ],
+                            }
+                        ],
+                    },
+                    {
+                        "type": "text",
+                        "text": beer.get("style", ""),
+                        "size": "md",
+                    },
+                    {
+                        "type": "text",
+                        "text": f"ABV: {beer.get('abv', '')}",
+                        "size": "xs",
+                    },
+                    {
+                        "type": "text",
+                        "text": f"Rating: {beer.get('rating', '')}",
+                        "color": "#8c8c8c",
+                        "size": "xs",
+                    },
+                    {
+                        "type": "button",
+                        "action": {
+                            "type": "uri",
+                            "label": "Check-in on Untappd",
+                            "uri": beer.get("check_in", "https://untappd.com"),
+                        },
+                        "gravity": "bottom",
+                        "height": "sm",
+                        "margin": "md",
+                    },
+                ],
+                "spacing": "none",
+                "paddingAll": "13px",
+            },
+            "footer": {
+                "type": "box",
+                "layout": "vertical",
+                "contents": [
+                    {
+                        "type": "button",
+                        "action": {
+                            "type": "postback",
+                            "label": "⭐ Save to My List",
+                            "data": save_data,
+                            "displayText": f"Saving {trim_string(beer.get('name', ''), 20)}...",
+                        },
+                        "style": "primary",
+                        "color": "#FFC107",
+                        "height": "sm",
+                    }
+                ],
+            },
+            "styles": {
+                "header": {"separator": False},
+                "footer": {"separator": True},
+            },
+        }
+        bubbles.append(bubble)
+
+    return {
+        "type": "flex",
+        "altText": "🍺 Drink like a Titan! Ciao",
+        "contents": {"type": "carousel", "contents": bubbles},
+    }
+
+
+def per_request(menu):
+    """Baseline: build the whole menu's dict tree and serialize the payload."""
+    payload = {"replyToken": "token", "messages": [original_carousel(menu)]}
+    return json.dumps(payload).encode("utf-8")
+
+
+def paged_build(beers, version):
+    """Build and serialize the first page without the cache."""
+    payload = {"replyToken": "token", "messages": [build_beer_carousel(beers, 0, version)]}
+    return json.dumps(payload).encode("utf-8")
+
+
+def cached(beers, version):
+    """Cached: look up the rendered bytes and splice them into the payload."""
+    return build_reply_payload("token", render_beer_carousel(beers, version))
+
+
+def main() -> None:
+    for size in (10, 30, 60):
+        menu = make_menu(size)
+        beers = decode_menu(menu)
+        version = menu_hash(beers)
+        cached(beers, version)  # warm the cache
+        print(f"--- {size} beers, first page {len(render_beer_carousel(beers, version))} bytes ---")
+        report("original full build + json.dumps", timeit.timeit(lambda: per_request(menu), number=LOOPS), LOOPS)
+        report("first page build + json.dumps", timeit.timeit(lambda: paged_build(beers, version), number=LOOPS), LOOPS)
+        report("cached render + splice", timeit.timeit(lambda: cached(beers, version), number=LOOPS), LOOPS)
+        report("menu_hash (once per refresh)", timeit.timeit(lambda: menu_hash(beers), number=LOOPS), LOOPS)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Compare the menu parser backends on saved venue HTML fixtures.
+
+Each backend runs in a fresh interpreter so peak memory is measured in
+isolation. Reports mean parse time, Python heap peak (tracemalloc) and the
+process peak RSS, which also covers libxml2's C allocations.
+
+Run from the repository root:
+    python -m benchmarks.bench_menu_parser
+"""
+import glob
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from app.menu_parser import BACKENDS, parse_menu
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+LOOPS = 50
+
+
+def measure(backend: str, path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        html = f.read()
+
+    # Import the backend's libraries before measuring
+    parse_menu("<html><body></body></html>", backend)
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    tracemalloc.start()
+    beers = parse_menu(html, backend)
+    _, heap_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    start = time.perf_counter()
+    for _ in range(LOOPS):
+        parse_menu(html, backend)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "beers": len(beers),
+        "ms_per_parse": elapsed / LOOPS * 1000,
+        "heap_peak_kb": heap_peak / 1024,
+        "rss_growth_kb": rss_after - rss_before,
+        "rss_peak_kb": rss_after,
+    }
+
+
+def main() -> None:
+    if len(sys.argv) == 4 and sys.argv[1] == "--child":
+        print(json.dumps(measure(sys.argv[2], sys.argv[3])))
+        return
+
+    print(f"{'fixture':<24} {'backend':<12} {'beers':>6} {'ms/parse':>10} {'heap peak':>12} {'RSS growth':>12} {'RSS peak':>12}")
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, "*.html"))):
+        for backend in BACKENDS:
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_menu_parser", "--child", backend, path],
+                capture_output=True,
+                text=True,
+            )
+            if output.returncode != 0:
+                print(f"{os.path.basename(path):<24} {backend:<12} failed: {output.stderr.strip().splitlines()[-1]}")
+                continue
+            r = json.loads(output.stdout)
+            print(
+                f"{os.path.basename(path):<24} {backend:<12} {r['beers']:>6} {r['ms_per_parse']:>10.2f}"
+                f" {r['heap_peak_kb']:>9.0f} KB {r['rss_growth_kb']:>9.0f} KB {r['rss_peak_kb']:>9.0f} KB"
+            )
+
+
+if __name__ == "__main__":
+    main()
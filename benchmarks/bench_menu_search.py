@@ -0,0 +1,50 @@
+"""
+Compare answering menu queries by scanning the tap list against the per-version index.
+
+Run from the repository root:
+    python -m benchmarks.bench_menu_search
+"""
+import timeit
+from typing import List
+
+from app.menu_search import MenuIndex, MenuQuery, parse_number, tokenize
+from app.models import Beer, decode_menu
+
+from .common import make_menu, report
+
+LOOPS = 5000
+QUERIES = ["ipa", "hazy >7%", "top", "stout top", "kyoto <5%"]
+
+
+def scan(beers: List[Beer], query: MenuQuery) -> List[int]:
+    """Baseline: tokenize and parse every beer's strings on each request."""
+    matches = []
+    for index, beer in enumerate(beers):
+        words = tokenize(beer.style) + tokenize(beer.brewery)
+        if not all(any(word.startswith(term) for word in words) for term in query.terms):
+            continue
+        abv = parse_number(beer.abv)
+        if query.min_abv is not None and (abv is None or abv < query.min_abv):
+            continue
+        if query.max_abv is not None and (abv is None or abv > query.max_abv):
+            continue
+        matches.append(index)
+    if query.top:
+        matches = [i for i in matches if parse_number(beers[i].rating) is not None]
+        matches.sort(key=lambda i: -parse_number(beers[i].rating))
+    return matches
+
+
+def main() -> None:
+    for size in (20, 60, 200):
+        beers = decode_menu(make_menu(size))
+        queries = [MenuQuery.parse(text) for text in QUERIES]
+        index = MenuIndex(beers)
+        print(f"--- {size} beers, {len(QUERIES)} queries per loop ---")
+        report("scan per request", timeit.timeit(lambda: [scan(beers, q) for q in queries], number=LOOPS), LOOPS)
+        report("index lookup", timeit.timeit(lambda: [index.search(q) for q in queries], number=LOOPS), LOOPS)
+        report("index build (once per version)", timeit.timeit(lambda: MenuIndex(beers), number=LOOPS), LOOPS)
+
+
+if __name__ == "__main__":
+    main()
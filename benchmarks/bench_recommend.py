@@ -0,0 +1,78 @@
+"""
+Compare scoring the tap list for a recommendation beer by beer against the per-version feature matrix.
+
+Run from the repository root:
+    python -m benchmarks.bench_recommend
+"""
+import timeit
+from typing import List
+
+from app.menu_search import parse_number
+from app.models import Beer, decode_menu
+from app.recommend import (
+    ABV_BIN_EDGES,
+    ABV_NEIGHBOUR_SHARE,
+    ABV_WEIGHT,
+    BREWERY_WEIGHT,
+    FAMILY_WEIGHT,
+    RATING_WEIGHT,
+    STYLE_WEIGHT,
+    MenuFeatures,
+    abv_bin,
+    beer_key,
+    style_family,
+)
+
+from .common import make_menu, report
+
+LOOPS = 2000
+COUNT = 5
+SAVED = 10
+
+
+def score_loop(beers: List[Beer], saved: List[Beer], count: int) -> List[int]:
+    """Baseline: compare every beer on tap with every saved beer on each request."""
+    saved_keys = {beer_key(beer) for beer in saved}
+    share = 1.0 / len(saved)
+    scores = []
+    for index, beer in enumerate(beers):
+        if beer_key(beer) in saved_keys:
+            continue
+        score = 0.0
+        strength = abv_bin(beer.abv)
+        for other in saved:
+            if beer.style and beer.style.lower() == other.style.lower():
+                score += STYLE_WEIGHT * share
+            if beer.style and style_family(beer.style) == style_family(other.style):
+                score += FAMILY_WEIGHT * share
+            if beer.brewery and beer.brewery.lower() == other.brewery.lower():
+                score += BREWERY_WEIGHT * share
+            other_strength = abv_bin(other.abv)
+            if strength >= 0 and other_strength >= 0:
+                distance = abs(strength - other_strength)
+                if distance == 0:
+                    score += ABV_WEIGHT * share
+                elif distance == 1:
+                    score += ABV_WEIGHT * share * ABV_NEIGHBOUR_SHARE
+        rating = parse_number(beer.rating)
+        if rating is not None:
+            score += RATING_WEIGHT * min(rating, 5.0) / 5.0
+        scores.append((-score, index))
+    scores.sort()
+    return [index for _, index in scores[:count]]
+
+
+def main() -> None:
+    print(f"{len(ABV_BIN_EDGES) + 1} ABV bins, {SAVED} saved beers, top {COUNT}")
+    for size in (20, 60, 200):
+        beers = decode_menu(make_menu(size))
+        saved = decode_menu(make_menu(SAVED, seed=1))
+        features = MenuFeatures(beers)
+        print(f"--- {size} beers ---")
+        report("python loop per request", timeit.timeit(lambda: score_loop(beers, saved, COUNT), number=LOOPS), LOOPS)
+        report("matrix @ profile", timeit.timeit(lambda: features.recommend(saved, COUNT), number=LOOPS), LOOPS)
+        report("matrix build (once per version)", timeit.timeit(lambda: MenuFeatures(beers), number=LOOPS), LOOPS)
+
+
+if __name__ == "__main__":
+    main()
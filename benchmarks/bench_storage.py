@@ -0,0 +1,115 @@
+"""
+Compare the original per-request SQLite access against SavedBeerStore.
+
+Builds a synthetic saved_beers table (1,000,000 rows by default) with the
+original schema, then measures "my beers" reads and saves:
+  - baseline: sqlite3.connect per request, default journal, no index
+  - store: reused connection, WAL + pragmas, migrated indexes
+
+Run from the repository root:
+    python -m benchmarks.bench_storage [rows]
+"""
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from app.storage import SavedBeerStore
+
+USERS = 5000
+READS = 200
+WRITES = 200
+
+
+def build_table(path: str, rows: int) -> None:
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE saved_beers (id INTEGER PRIMARY KEY, user_id TEXT, beer_name TEXT, brewery TEXT, "
+        "style TEXT, abv TEXT, rating TEXT, label TEXT, saved_at TEXT)"
+    )
+    rng = random.Random(0)
+    start = datetime(2023, 1, 1)
+
+    def generate():
+        for i in range(rows):
+            yield (
+                f"U{rng.randrange(USERS):032x}",
+                f"Beer {i}",
+                f"Brewery {rng.randrange(300)}",
+                "IPA - American",
+                "6.5%",
+                "3.85",
+                f"https://assets.untappd.com/site/beer_logos/beer-{i}.jpeg",
+                (start + timedelta(seconds=i * 30)).isoformat(),
+            )
+
+    conn.executemany(
+        "INSERT INTO saved_beers (user_id, beer_name, brewery, style, abv, rating, label, saved_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        generate(),
+    )
+    conn.commit()
+    conn.close()
+
+
+def baseline_read(path: str, user_id: str) -> list:
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.execute("SELECT * FROM saved_beers WHERE user_id = ? ORDER BY saved_at DESC", (user_id,))
+    beers = [dict(row) for row in cursor.fetchall()]
+    conn.close()
+    return beers[:10]
+
+
+def baseline_write(path: str, user_id: str, name: str) -> None:
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "INSERT INTO saved_beers (user_id, beer_name, brewery, style, abv, rating, label, saved_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        (user_id, name, "Bench Brewery", "", "", "", "", datetime.now().isoformat()),
+    )
+    conn.commit()
+    conn.close()
+
+
+def timed(label: str, fn, count: int) -> None:
+    start = time.perf_counter()
+    for i in range(count):
+        fn(i)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<44} {elapsed / count * 1000:>9.3f} ms/op")
+
+
+def main() -> None:
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rng = random.Random(1)
+    users = [f"U{rng.randrange(USERS):032x}" for _ in range(max(READS, WRITES))]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "beers.db")
+        start = time.perf_counter()
+        build_table(path, rows)
+        print(f"built {rows:,} rows in {time.perf_counter() - start:.1f}s ({os.path.getsize(path) / 1e6:.0f} MB)")
+
+        timed("baseline: my beers (connect, full scan)", lambda i: baseline_read(path, users[i]), READS)
+        timed("baseline: save (connect, rollback journal)", lambda i: baseline_write(path, users[i], f"Base {i}"), WRITES)
+
+        store = SavedBeerStore(path)
+        start = time.perf_counter()
+        store.migrate()
+        print(f"migration (dedupe + indexes) took {time.perf_counter() - start:.1f}s")
+
+        timed("store: my beers page (index, reused conn)", lambda i: store.page(users[i], 10), READS)
+        timed("store: save (WAL, reused conn)", lambda i: store.save(users[i], {"beer_name": f"Store {i}"}), WRITES)
+        saves = [{"ref": f"p{i}", "user_id": users[i], "beer_name": f"Bulk {i}"} for i in range(WRITES)]
+        start = time.perf_counter()
+        store.bulk(saves, [])
+        elapsed = time.perf_counter() - start
+        print(f"{f'store: bulk of {WRITES} saves, one transaction':<44} {elapsed / WRITES * 1000:>9.3f} ms/op")
+
+
+if __name__ == "__main__":
+    main()
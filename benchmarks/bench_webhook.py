@@ -0,0 +1,87 @@
+"""
+Compare per-webhook CPU time of the old ingestion path against the single-parse one.
+
+Old: verify the signature, parse the body twice (request.body() then
+request.json()), pretty-print it for the log, and encode the reply with
+stdlib json. New: the shipped path, i.e. app.line_handler.verify_signature,
+app.json_codec.loads and app.line_handler.build_reply_payload (which also
+checks the reply against Line's limits with fit_reply). Encoding covers a
+freshly built carousel, as on a cache miss; cached carousels are spliced
+as bytes either way.
+
+Run from the repository root:
+    python -m benchmarks.bench_webhook
+"""
+import base64
+import hashlib
+import hmac
+import json
+import timeit
+
+from app import json_codec, line_handler
+from app.flex_messages import build_beer_carousel
+from app.line_handler import build_reply_payload, verify_signature
+from app.models import decode_menu
+
+from .common import make_menu, report
+
+LOOPS = 5000
+SECRET = "benchmark-channel-secret"
+
+
+def make_webhook(events: int) -> bytes:
+    """A Line webhook body with `events` text message events."""
+    body = {
+        "destination": "U" + "0" * 32,
+        "events": [
+            {
+                "type": "message",
+                "message": {"type": "text", "id": str(468789577898262530 + i), "quoteToken": "q" * 40, "text": "beer"},
+                "webhookEventId": f"01H810YECXQQZ37VAXPF6H{i:04d}",
+                "deliveryContext": {"isRedelivery": False},
+                "timestamp": 1692251666727,
+                "source": {"type": "user", "userId": f"U{i:032x}"},
+                "replyToken": f"{i:032x}",
+                "mode": "active",
+            }
+            for i in range(events)
+        ],
+    }
+    return json.dumps(body).encode("utf-8")
+
+
+def sign(body: bytes) -> str:
+    return base64.b64encode(hmac.new(SECRET.encode("utf-8"), body, hashlib.sha256).digest()).decode("utf-8")
+
+
+def old_path(body: bytes, signature: str, message) -> None:
+    verify_signature(body, signature)
+    json.loads(body)  # request.json() after request.body()
+    parsed = json.loads(body)
+    json.dumps(parsed, indent=2, ensure_ascii=False)  # debug print
+    for event in parsed["events"]:
+        json.dumps({"replyToken": event["replyToken"], "messages": [message]}).encode("utf-8")
+
+
+def new_path(body: bytes, signature: str, message) -> None:
+    assert verify_signature(body, signature)
+    parsed = json_codec.loads(body)
+    for event in parsed["events"]:
+        build_reply_payload(event["replyToken"], message)
+
+
+def main() -> None:
+    # verify_signature skips the check when no secret is configured
+    line_handler.LINE_CHANNEL_SECRET = SECRET
+    message = build_beer_carousel(decode_menu(make_menu(30)))
+    print(f"JSON backend: {json_codec.BACKEND}")
+    for events in (1, 5):
+        body = make_webhook(events)
+        signature = sign(body)
+        print(f"--- {events} event(s), {len(body)} byte body ---")
+        report("old: parse x2 + log dump + json reply", timeit.timeit(lambda: old_path(body, signature, message), number=LOOPS), LOOPS)
+        report("new: shipped verify + parse + reply", timeit.timeit(lambda: new_path(body, signature, message), number=LOOPS), LOOPS)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Shared helpers for the benchmark scripts."""
+import random
+from typing import List, Dict
+
+STYLES = [
+    "IPA - American",
+    "IPA - New England / Hazy",
+    "Pale Ale - American",
+    "Stout - Imperial / Double",
+    "Sour - Fruited",
+    "Lager - Helles",
+    "Pilsner - German",
+    "Belgian Tripel",
+    "Wheat Beer - Hefeweizen",
+    "Porter - Baltic",
+]
+
+BREWERIES = [
+    "Hage & Hige Brewing",
+    "Shiga Kogen Beer",
+    "Kyoto Brewing Co.",
+    "Minoh Beer",
+    "Baird Brewing Company",
+    "Y.Market Brewing",
+    "Ise Kadoya Brewery",
+    "Far Yeast Brewing",
+]
+
+
+def make_menu(size: int, seed: int = 0) -> List[Dict[str, str]]:
+    """Build a synthetic tap list with the scraper API's schema."""
+    rng = random.Random(seed)
+    beers = []
+    for i in range(size):
+        beer_id = 1000000 + i
+        name = f"Titan Test Beer {i} {rng.choice(['Hazy', 'Dry Hopped', 'Barrel Aged', 'Session', 'Double'])}"
+        beers.append({
+            "name": name,
+            "brewery": rng.choice(BREWERIES),
+            "style": rng.choice(STYLES),
+            "abv": f"{rng.uniform(3.5, 12.0):.1f}%",
+            "label": f"https://assets.untappd.com/site/beer_logos/beer-{beer_id}_{rng.getrandbits(20):05x}_sm.jpeg",
+            "rating": f"{rng.uniform(3.0, 4.6):.2f}",
+            "check_in": f"https://untappd.com/b/titan-test-beer-{i}/{beer_id}",
+        })
+    return beers
+
+
+def report(label: str, seconds: float, loops: int) -> None:
+    """Print the mean time per loop in microseconds."""
+    print(f"{label:<40} {seconds / loops * 1e6:>10.1f} us/op")
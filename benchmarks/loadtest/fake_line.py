@@ -0,0 +1,60 @@
+"""
+Local stand-in for the Line reply and push APIs.
+
+Accepts replies and pushes, records their size and message count, and delays each
+response by FAKE_LINE_LATENCY_MS.
+
+    FAKE_LINE_LATENCY_MS=30 uvicorn benchmarks.loadtest.fake_line:app --port 5056
+"""
+import asyncio
+import json
+import os
+from collections import deque
+
+from fastapi import FastAPI, Request
+
+LATENCY_MS = float(os.getenv("FAKE_LINE_LATENCY_MS", "30"))
+KEEP_PAYLOADS = int(os.getenv("FAKE_LINE_KEEP_PAYLOADS", "20"))
+
+app = FastAPI(title="Fake Line reply API")
+
+stats = {"replies": 0, "pushes": 0, "messages": 0, "bytes": 0, "invalid": 0, "max_bytes": 0}
+recent = deque(maxlen=KEEP_PAYLOADS)
+
+
+@app.post("/v2/bot/message/reply")
+async def reply(request: Request):
+    return await record(request, "replies")
+
+
+@app.post("/v2/bot/message/push")
+async def push(request: Request):
+    return await record(request, "pushes")
+
+
+async def record(request: Request, kind: str):
+    body = await request.body()
+    if LATENCY_MS > 0:
+        await asyncio.sleep(LATENCY_MS / 1000)
+    try:
+        payload = json.loads(body)
+        messages = payload["messages"]
+    except (ValueError, KeyError):
+        stats["invalid"] += 1
+        return {"message": "invalid payload"}
+    stats[kind] += 1
+    stats["messages"] += len(messages)
+    stats["bytes"] += len(body)
+    stats["max_bytes"] = max(stats["max_bytes"], len(body))
+    recent.append(payload)
+    return {}
+
+
+@app.get("/_stats")
+async def get_stats():
+    return stats
+
+
+@app.get("/_recent")
+async def get_recent():
+    return list(recent)
@@ -0,0 +1,123 @@
+"""
+Local stand-in for the Oracle VM scraper API.
+
+Serves a synthetic tap list (with ETags) and keeps saved beers in memory.
+Every response is delayed by FAKE_SCRAPER_LATENCY_MS to mimic the VM.
+
+    FAKE_MENU_SIZE=40 FAKE_SCRAPER_LATENCY_MS=80 \\
+        uvicorn benchmarks.loadtest.fake_scraper:app --port 5055
+"""
+import asyncio
+import hashlib
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, List
+
+from fastapi import FastAPI, Request, Response
+
+from ..common import make_menu
+
+MENU_SIZE = int(os.getenv("FAKE_MENU_SIZE", "40"))
+LATENCY_MS = float(os.getenv("FAKE_SCRAPER_LATENCY_MS", "50"))
+
+app = FastAPI(title="Fake scraper API")
+
+MENU_BODY = json.dumps(make_menu(MENU_SIZE)).encode("utf-8")
+MENU_ETAG = '"' + hashlib.blake2b(MENU_BODY, digest_size=8).hexdigest() + '"'
+
+# user_id -> saved rows, newest first
+saved: Dict[str, List[Dict[str, Any]]] = {}
+next_id = 1
+stats = {"menu": 0, "menu_not_modified": 0, "mybeers": 0, "bulk": 0, "saves": 0, "deletes": 0}
+
+
+async def upstream_delay() -> None:
+    if LATENCY_MS > 0:
+        await asyncio.sleep(LATENCY_MS / 1000)
+
+
+def save_row(user_id: str, beer: Dict[str, Any]) -> Dict[str, Any]:
+    global next_id
+    rows = saved.setdefault(user_id, [])
+    for row in rows:
+        if row["beer_name"] == beer.get("beer_name") and row["brewery"] == (beer.get("brewery") or ""):
+            return row
+    row = {
+        "id": next_id,
+        "user_id": user_id,
+        "beer_name": beer.get("beer_name"),
+        "brewery": beer.get("brewery") or "",
+        "style": beer.get("style", ""),
+        "abv": beer.get("abv", ""),
+        "rating": beer.get("rating", ""),
+        "label": beer.get("label", ""),
+        "saved_at": datetime.now().isoformat(),
+    }
+    next_id += 1
+    rows.insert(0, row)
+    stats["saves"] += 1
+    return row
+
+
+def delete_row(user_id: str, beer_id: Any) -> None:
+    rows = saved.get(user_id, [])
+    saved[user_id] = [row for row in rows if row["id"] != beer_id]
+    stats["deletes"] += len(rows) - len(saved[user_id])
+
+
+@app.get("/")
+async def menu(request: Request):
+    await upstream_delay()
+    if request.headers.get("if-none-match") == MENU_ETAG:
+        stats["menu_not_modified"] += 1
+        return Response(status_code=304, headers={"ETag": MENU_ETAG})
+    stats["menu"] += 1
+    return Response(MENU_BODY, media_type="application/json", headers={"ETag": MENU_ETAG})
+
+
+@app.get("/mybeers/{user_id}")
+async def my_beers(user_id: str, limit: int = 10, after: str = ""):
+    await upstream_delay()
+    stats["mybeers"] += 1
+    rows = saved.get(user_id, [])
+    if after:
+        saved_at, _, beer_id = after.rpartition("|")
+        rows = [row for row in rows if (row["saved_at"], row["id"]) < (saved_at, int(beer_id))]
+    page = rows[:limit]
+    next_cursor = f"{page[-1]['saved_at']}|{page[-1]['id']}" if len(rows) > limit else None
+    return {"beers": page, "next": next_cursor}
+
+
+@app.post("/save")
+async def save(request: Request):
+    await upstream_delay()
+    data = await request.json()
+    return {"status": "saved", **save_row(data.get("user_id"), data)}
+
+
+@app.post("/delete")
+async def delete(request: Request):
+    await upstream_delay()
+    data = await request.json()
+    delete_row(data.get("user_id"), data.get("id"))
+    return {"status": "deleted"}
+
+
+@app.post("/bulk")
+async def bulk(request: Request):
+    await upstream_delay()
+    stats["bulk"] += 1
+    data = await request.json()
+    for item in data.get("deletes", []):
+        delete_row(item.get("user_id"), item.get("id"))
+    result = {}
+    for item in data.get("saves", []):
+        row = save_row(item.get("user_id"), item)
+        result[item.get("ref")] = {"id": row["id"], "saved_at": row["saved_at"]}
+    return {"status": "ok", "saved": result}
+
+
+@app.get("/_stats")
+async def get_stats():
+    return stats
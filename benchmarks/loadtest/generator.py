@@ -0,0 +1,171 @@
+"""
+Load generator: sends HMAC-signed Line webhooks to the bot's /webhook.
+
+Runs `concurrency` closed-loop workers for `duration` seconds. Each request
+carries one event picked from a weighted mix of commands and postbacks.
+"""
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import random
+import time
+import uuid
+from typing import Any, Dict, List, Tuple
+
+import httpx
+
+from app.flex_messages import menu_postback
+from app.models import decode_menu
+from app.scraper import menu_hash
+
+from ..common import make_menu
+
+# Event kind -> weight
+DEFAULT_MIX = {
+    "beer": 40,
+    "my_beers": 15,
+    "size": 10,
+    "staff": 5,
+    "beer_page": 10,
+    "save_beer": 15,
+    "unknown_text": 5,
+}
+
+TEXT_COMMANDS = {"beer": "beer", "my_beers": "my beers", "size": "size", "staff": "staff", "unknown_text": "hello"}
+
+
+def parse_mix(spec: str) -> Dict[str, int]:
+    """Parse "beer=40,save_beer=20" into a mix; unknown kinds raise ValueError."""
+    mix = {}
+    for part in spec.split(","):
+        kind, _, weight = part.partition("=")
+        kind = kind.strip()
+        if kind not in DEFAULT_MIX:
+            raise ValueError(f"Unknown event kind {kind!r}; choose from {', '.join(DEFAULT_MIX)}")
+        mix[kind] = int(weight)
+    return mix
+
+
+def sign(secret: str, body: bytes) -> str:
+    digest = hmac.new(secret.encode("utf-8"), body, hashlib.sha256).digest()
+    return base64.b64encode(digest).decode("utf-8")
+
+
+class EventFactory:
+    """
+    Builds realistic webhook bodies for a pool of users.
+    Menu postbacks use the version the bot computes for the fake scraper's tap list.
+    """
+
+    def __init__(self, users: int, menu_size: int, seed: int = 0):
+        self.rng = random.Random(seed)
+        self.users = [f"U{uuid.UUID(int=self.rng.getrandbits(128)).hex}" for _ in range(users)]
+        self.menu_size = menu_size
+        self.version = menu_hash(decode_menu(make_menu(menu_size)))
+
+    def event(self, kind: str) -> Dict[str, Any]:
+        event: Dict[str, Any] = {
+            "webhookEventId": uuid.uuid4().hex.upper()[:26],
+            "deliveryContext": {"isRedelivery": False},
+            "timestamp": int(time.time() * 1000),
+            "source": {"type": "user", "userId": self.rng.choice(self.users)},
+            "replyToken": uuid.uuid4().hex,
+            "mode": "active",
+        }
+        if kind in TEXT_COMMANDS:
+            event["type"] = "message"
+            event["message"] = {"type": "text", "id": str(self.rng.getrandbits(60)), "text": TEXT_COMMANDS[kind]}
+        elif kind == "beer_page":
+            event["type"] = "postback"
+            event["postback"] = {"data": menu_postback("beer_page", self.version, 1)}
+        elif kind == "save_beer":
+            index = self.rng.randrange(self.menu_size)
+            event["type"] = "postback"
+            event["postback"] = {"data": menu_postback("save_beer", self.version, index)}
+        else:
+            raise ValueError(f"Unknown event kind {kind!r}")
+        return event
+
+    def body(self, kind: str) -> bytes:
+        return json.dumps({"destination": "Ufakebot", "events": [self.event(kind)]}).encode("utf-8")
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+async def run_load(
+    bot_url: str,
+    secret: str,
+    duration: float,
+    concurrency: int,
+    mix: Dict[str, int],
+    factory: EventFactory,
+    warmup: float = 2.0,
+) -> Tuple[Dict[str, List[float]], Dict[str, int], float]:
+    """
+    Drive the bot for `warmup` + `duration` seconds.
+    Returns latencies (seconds) per event kind, error counts, and the measured wall time.
+    """
+    kinds = list(mix)
+    weights = [mix[kind] for kind in kinds]
+    latencies: Dict[str, List[float]] = {kind: [] for kind in kinds}
+    errors: Dict[str, int] = {}
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=bot_url, limits=limits, timeout=30) as client:
+        loop_start = time.perf_counter()
+        measure_from = loop_start + warmup
+        stop_at = measure_from + duration
+
+        async def worker() -> None:
+            while True:
+                now = time.perf_counter()
+                if now >= stop_at:
+                    return
+                kind = factory.rng.choices(kinds, weights)[0]
+                body = factory.body(kind)
+                headers = {"Content-Type": "application/json", "X-Line-Signature": sign(secret, body)}
+                start = time.perf_counter()
+                try:
+                    response = await client.post("/webhook", content=body, headers=headers)
+                    ok = response.status_code == 200
+                    reason = f"http_{response.status_code}"
+                except httpx.HTTPError as e:
+                    ok, reason = False, type(e).__name__
+                end = time.perf_counter()
+                if start < measure_from:
+                    continue
+                if ok:
+                    latencies[kind].append(end - start)
+                else:
+                    errors[reason] = errors.get(reason, 0) + 1
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        wall = time.perf_counter() - measure_from
+    return latencies, errors, wall
+
+
+def report(latencies: Dict[str, List[float]], errors: Dict[str, int], wall: float) -> None:
+    """Print throughput and latency percentiles, overall and per event kind."""
+    def row(label: str, values: List[float]) -> str:
+        values = sorted(values)
+        return (
+            f"{label:<14} {len(values):>8} "
+            f"{percentile(values, 50) * 1000:>9.1f} {percentile(values, 95) * 1000:>9.1f} "
+            f"{percentile(values, 99) * 1000:>9.1f} {(values[-1] if values else 0) * 1000:>9.1f}"
+        )
+
+    everything = [value for values in latencies.values() for value in values]
+    print(f"\nThroughput: {len(everything) / wall:.1f} webhooks/s over {wall:.1f}s")
+    print(f"Errors: {sum(errors.values())} {errors if errors else ''}")
+    print(f"\n{'kind':<14} {'count':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    print(row("all", everything))
+    for kind, values in latencies.items():
+        print(row(kind, values))
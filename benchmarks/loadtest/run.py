@@ -0,0 +1,146 @@
+"""
+End-to-end load test of the bot against local fakes of its upstreams.
+
+Starts the fake scraper API, the fake Line reply API and the bot (each a
+uvicorn process, bot pointed at the fakes), then drives /webhook with
+signed events and reports throughput and p50/p95/p99 latency of the
+acknowledgements, then waits for the queued events to be replied to.
+
+Run from the repository root:
+    python -m benchmarks.loadtest.run --duration 20 --concurrency 32
+    python -m benchmarks.loadtest.run --mix beer=70,save_beer=30 --scraper-latency-ms 200
+    python -m benchmarks.loadtest.run --bot-workers 4   # workers share one menu snapshot
+    python -m benchmarks.loadtest.run --bot-url http://127.0.0.1:8000   # bot started by hand
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import httpx
+
+from .generator import DEFAULT_MIX, EventFactory, parse_mix, report, run_load
+
+SECRET = "loadtest-channel-secret"
+
+
+def start_server(target: str, port: int, env: Dict[str, str], log_path: str, workers: int = 1) -> subprocess.Popen:
+    log = open(log_path, "w")
+    return subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", target, "--host", "127.0.0.1", "--port", str(port),
+            "--log-level", "warning", "--workers", str(workers),
+        ],
+        env={**os.environ, **env},
+        stdout=log,
+        stderr=subprocess.STDOUT,
+    )
+
+
+def wait_until_up(url: str, timeout: float = 20.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    raise RuntimeError(f"{url} did not come up within {timeout:.0f}s")
+
+
+def wait_for_drain(bot_url: str, timeout: float = 60.0) -> float:
+    """Wait until the bot has handled every queued event; returns the seconds waited."""
+    start = time.monotonic()
+    while time.monotonic() - start < timeout:
+        events = httpx.get(f"{bot_url}/status", timeout=5.0).json()["events"]
+        if not events["pending"] and not events["running"]:
+            break
+        time.sleep(0.2)
+    return time.monotonic() - start
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=15, help="measured seconds (default 15)")
+    parser.add_argument("--warmup", type=float, default=2, help="unmeasured seconds first (default 2)")
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent webhook senders (default 16)")
+    parser.add_argument("--users", type=int, default=200, help="distinct Line users (default 200)")
+    parser.add_argument("--mix", default="", help="event mix, e.g. beer=40,my_beers=15,save_beer=15")
+    parser.add_argument("--menu-size", type=int, default=40, help="beers on the fake tap list (default 40)")
+    parser.add_argument("--scraper-latency-ms", type=float, default=50, help="fake scraper API delay (default 50)")
+    parser.add_argument("--line-latency-ms", type=float, default=30, help="fake Line API delay (default 30)")
+    parser.add_argument("--bot-url", default="", help="use an already running bot instead of starting one")
+    parser.add_argument("--bot-workers", type=int, default=1, help="bot worker processes (default 1)")
+    parser.add_argument("--secret", default=SECRET, help="channel secret used to sign webhooks")
+    parser.add_argument("--base-port", type=int, default=18000, help="bot, scraper and Line ports start here")
+    args = parser.parse_args(argv)
+
+    mix = parse_mix(args.mix) if args.mix else DEFAULT_MIX
+    bot_port, scraper_port, line_port = args.base_port, args.base_port + 1, args.base_port + 2
+    scraper_url = f"http://127.0.0.1:{scraper_port}"
+    line_url = f"http://127.0.0.1:{line_port}"
+    log_dir = tempfile.mkdtemp(prefix="titans-loadtest-")
+
+    processes = []
+    try:
+        processes.append(start_server(
+            "benchmarks.loadtest.fake_scraper:app", scraper_port,
+            {"FAKE_MENU_SIZE": str(args.menu_size), "FAKE_SCRAPER_LATENCY_MS": str(args.scraper_latency_ms)},
+            os.path.join(log_dir, "fake_scraper.log"),
+        ))
+        processes.append(start_server(
+            "benchmarks.loadtest.fake_line:app", line_port,
+            {"FAKE_LINE_LATENCY_MS": str(args.line_latency_ms)},
+            os.path.join(log_dir, "fake_line.log"),
+        ))
+        wait_until_up(f"{scraper_url}/_stats")
+        wait_until_up(f"{line_url}/_stats")
+
+        bot_url = args.bot_url
+        if not bot_url:
+            bot_url = f"http://127.0.0.1:{bot_port}"
+            processes.append(start_server("app.main:app", bot_port, {
+                "SCRAPER_API_URL": scraper_url,
+                "LINE_REPLY_URL": f"{line_url}/v2/bot/message/reply",
+                "LINE_PUSH_URL": f"{line_url}/v2/bot/message/push",
+                "LINE_CHANNEL_SECRET": args.secret,
+                "LINE_CHANNEL_ACCESS_TOKEN": "loadtest",
+                "WRITE_BEHIND_SPOOL_PATH": os.path.join(log_dir, "write-behind.json"),
+                # Keep the fake menu away from the snapshot a local bot loads on boot
+                "MENU_SNAPSHOT_PATH": os.path.join(log_dir, "menu-store.snapshot"),
+                "SHARED_MENU_PATH": os.path.join(log_dir, "menu.snapshot") if args.bot_workers > 1 else "",
+            }, os.path.join(log_dir, "bot.log"), workers=args.bot_workers))
+            wait_until_up(f"{bot_url}/")
+
+        print(f"Bot {bot_url}, fake scraper {scraper_url}, fake Line {line_url} (logs in {log_dir})")
+        print(f"{args.concurrency} senders, {args.users} users, {args.duration:.0f}s after {args.warmup:.0f}s warm-up")
+        print("Mix: " + ", ".join(f"{kind}={weight}" for kind, weight in mix.items()))
+
+        factory = EventFactory(args.users, args.menu_size)
+        latencies, errors, wall = asyncio.run(run_load(
+            bot_url, args.secret, args.duration, args.concurrency, mix, factory, args.warmup,
+        ))
+        report(latencies, errors, wall)
+        # Webhooks are acknowledged before they are handled; let the replies catch up
+        drained = wait_for_drain(bot_url)
+        replied = httpx.get(f"{line_url}/_stats").json()["replies"]
+        print(f"\nQueued events drained {drained:.1f}s after the last webhook ({replied / (wall + drained):.1f} replies/s)")
+
+        print(f"\nFake scraper: {httpx.get(f'{scraper_url}/_stats').json()}")
+        print(f"Fake Line:    {httpx.get(f'{line_url}/_stats').json()}")
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+if __name__ == "__main__":
+    main()
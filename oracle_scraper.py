@@ -0,0 +1,88 @@
+import logging
+
+from flask import Flask, jsonify, request
+import requests
+
+from app.menu_parser import parse_menu
+from app.storage import SavedBeerStore
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+app = Flask(__name__)
+DB_PATH = '/home/opc/beers.db'
+MYBEERS_MAX_LIMIT = 50
+
+store = SavedBeerStore(DB_PATH)
+
+
+def conditional_json(payload):
+    """JSON response with a content-hash ETag; answers 304 if If-None-Match matches."""
+    response = jsonify(payload)
+    response.add_etag()
+    return response.make_conditional(request)
+
+
+@app.route('/')
+def get_beers():
+    url = "https://untappd.com/v/titans-craft-beer-bar-and-bottle-shop/5286704"
+    headers = {"User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36"}
+
+    try:
+        response = requests.get(url, headers=headers, timeout=20)
+        beers = parse_menu(response.text)
+        return conditional_json(beers)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/save', methods=['POST'])
+def save_beer():
+    data = request.json
+    row = store.save(data.get('user_id'), data)
+
+    return jsonify({"status": "saved", **row})
+
+
+@app.route('/delete', methods=['POST'])
+def delete_beer():
+    data = request.json
+    store.delete(data.get('user_id'), data.get('id'))
+
+    return jsonify({"status": "deleted"})
+
+
+@app.route('/bulk', methods=['POST'])
+def bulk_write():
+    """Apply a batch of deletes and saves in one transaction."""
+    data = request.json
+    saved = store.bulk(data.get('saves', []), data.get('deletes', []))
+
+    return jsonify({"status": "ok", "saved": saved})
+
+
+@app.route('/mybeers/<user_id>')
+def get_my_beers(user_id):
+    limit = request.args.get('limit', type=int)
+    if limit is None:
+        # Legacy response: the user's whole history as a list
+        return jsonify(store.list_all(user_id))
+
+    # Keyset pagination: newest first, resuming strictly after the cursor row
+    limit = max(1, min(limit, MYBEERS_MAX_LIMIT))
+    fields = request.args.get('fields')
+    try:
+        if fields:
+            beers, next_cursor = store.page(user_id, limit, request.args.get('after'), fields.split(','))
+        else:
+            beers, next_cursor = store.page(user_id, limit, request.args.get('after'))
+    except ValueError:
+        return jsonify({"error": "invalid cursor"}), 400
+
+    return conditional_json({
+        "beers": beers,
+        "next": next_cursor,
+    })
+
+
+if __name__ == '__main__':
+    app.run(host='0.0.0.0', port=5000)
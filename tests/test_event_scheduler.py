@@ -0,0 +1,46 @@
+import asyncio
+
+from app.event_scheduler import EventScheduler
+from app.logging_setup import request_id
+
+
+def test_events_keep_the_request_id_of_their_webhook():
+    seen = []
+
+    async def handler(event, deadline):
+        await asyncio.sleep(0)
+        seen.append((event["n"], request_id.get()))
+
+    async def main():
+        scheduler = EventScheduler(handler, concurrency=1)
+        source = {"type": "user", "userId": "alice"}
+        # The second event is dispatched from the first one's task, after it finishes
+        request_id.set("req-1")
+        scheduler.submit({"n": 1, "source": source})
+        request_id.set("req-2")
+        scheduler.submit({"n": 2, "source": source})
+        await scheduler.close(timeout=1)
+
+    asyncio.run(main())
+    assert seen == [(1, "req-1"), (2, "req-2")]
+
+
+def test_close_does_not_start_queued_events_while_cancelling():
+    started = []
+
+    async def handler(event, deadline):
+        started.append(event["n"])
+        await asyncio.sleep(10)
+
+    async def main():
+        scheduler = EventScheduler(handler, concurrency=1)
+        for n in range(3):
+            scheduler.submit({"n": n, "source": {"type": "user", "userId": "alice"}})
+        await asyncio.sleep(0)
+        await scheduler.close(timeout=0.05)
+        await asyncio.sleep(0)
+        assert scheduler.stats()["running"] == 0
+        assert not scheduler._tasks
+
+    asyncio.run(main())
+    assert started == [0]
@@ -0,0 +1,32 @@
+from collections import OrderedDict
+
+from app import flex_messages
+from app.models import Beer
+
+BEERS = [Beer("Titan IPA", "Hage & Hige Brewing", "IPA - American", "6.5%", "3.90")]
+
+
+def test_carousel_cache_keeps_recently_used_pages(monkeypatch):
+    monkeypatch.setattr(flex_messages, "_carousel_cache", OrderedDict())
+    monkeypatch.setattr(flex_messages, "CAROUSEL_CACHE_MAX_ENTRIES", 2)
+    current = flex_messages.render_beer_carousel(BEERS, "current")
+    flex_messages.render_beer_carousel(BEERS, "old-1")
+    assert flex_messages.render_beer_carousel(BEERS, "current") is current
+
+    # Evicts the least recently used page, not the oldest inserted one
+    flex_messages.render_beer_carousel(BEERS, "old-2")
+    assert ("current", 0) in flex_messages._carousel_cache
+    assert ("old-1", 0) not in flex_messages._carousel_cache
+
+
+def test_prerendering_a_long_menu_keeps_all_its_pages(monkeypatch):
+    monkeypatch.setattr(flex_messages, "_carousel_cache", OrderedDict())
+    monkeypatch.setattr(flex_messages, "CAROUSEL_CACHE_MAX_ENTRIES", 2)
+    long_menu = BEERS * (flex_messages.BEER_PAGE_SIZE * 3 // len(BEERS) + 1)
+    pages = flex_messages.page_count(long_menu)
+    assert pages > 2
+
+    flex_messages.render_beer_carousel(BEERS, "old")
+    flex_messages.prerender_beer_carousels(long_menu, "current")
+    assert ("old", 0) not in flex_messages._carousel_cache
+    assert all(("current", page) in flex_messages._carousel_cache for page in range(pages))
@@ -0,0 +1,30 @@
+import asyncio
+import time
+
+from app import line_handler
+from app.models import Beer
+from app.scraper import MenuSnapshot
+
+BEERS = [
+    Beer("Titan IPA", "Hage & Hige Brewing", "IPA - American", "6.5%", "3.90"),
+    Beer("Kyoto Stout", "Kyoto Brewing Co.", "Stout - Imperial / Double", "9.0%", "4.10"),
+]
+
+
+def reply_to(text: str, source_type: str):
+    event = {
+        "type": "message",
+        "message": {"type": "text", "text": text},
+        "source": {"type": source_type, "userId": "alice", "groupId": "g1"},
+    }
+    return asyncio.run(line_handler.handle_message(event))
+
+
+def test_group_chat_without_a_match_gets_no_reply(monkeypatch):
+    monkeypatch.setattr(line_handler.menu_cache, "snapshot", MenuSnapshot(BEERS, "v1", time.monotonic()))
+
+    assert reply_to("beer tonight?", "group") is None
+    assert reply_to("beer ?", "group") is None
+    assert reply_to("beer ipa", "group") is not None
+    assert reply_to("beer >12%", "group")["text"].startswith("Nothing on tap matches")
+    assert reply_to("beer tonight?", "user")["text"].startswith("Nothing on tap matches")
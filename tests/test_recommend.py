@@ -0,0 +1,68 @@
+import asyncio
+import json
+import time
+
+from app import line_handler
+from app.models import Beer
+from app.scraper import MenuSnapshot
+
+MENU = [
+    Beer("Titan IPA", "Hage & Hige Brewing", "IPA - American", "6.5%", "3.90"),
+    Beer("Titan Hazy", "Hage & Hige Brewing", "IPA - New England / Hazy", "6.8%", "4.00"),
+    Beer("Kyoto Stout", "Kyoto Brewing Co.", "Stout - Imperial / Double", "9.0%", "4.10"),
+]
+
+
+def test_beers_saved_on_older_pages_are_not_recommended(monkeypatch):
+    # Newest saves on the first page; "Titan Hazy" was saved long ago, on the second
+    pages = {
+        None: {"beers": [{"id": 2, "beer_name": "Titan IPA", "brewery": "Hage & Hige Brewing",
+                          "style": "IPA - American", "abv": "6.5%"}], "next": "c1"},
+        "c1": {"beers": [{"id": 1, "beer_name": "Titan Hazy", "brewery": "Hage & Hige Brewing",
+                          "style": "IPA - New England / Hazy", "abv": "6.8%"}], "next": None},
+    }
+
+    class Response:
+        def __init__(self, body):
+            self.body = body
+
+        def json(self):
+            return self.body
+
+    async def fake_request(method, path, params=None, **kwargs):
+        assert params["fields"] == line_handler.RECOMMEND_FIELDS
+        return Response(pages[params.get("after")])
+
+    monkeypatch.setattr(line_handler, "scraper_request", fake_request)
+    monkeypatch.setattr(line_handler, "recommend_profiles", line_handler.SavedProfileCache())
+    monkeypatch.setattr(line_handler.menu_cache, "snapshot", MenuSnapshot(MENU, "v1", time.monotonic()))
+
+    reply = json.loads(asyncio.run(line_handler.recommend_beers("alice")))
+    bubbles = reply["contents"]["contents"]
+    assert len(bubbles) == 1
+    assert "Kyoto Stout" in json.dumps(bubbles[0], ensure_ascii=False)
+
+
+def test_repeat_recommendations_reuse_the_saved_beers_until_a_write(monkeypatch):
+    calls = []
+
+    class Response:
+        def json(self):
+            return {"beers": [{"id": 1, "beer_name": "Titan IPA", "brewery": "Hage & Hige Brewing",
+                               "style": "IPA - American", "abv": "6.5%"}], "next": None}
+
+    async def fake_request(method, path, params=None, **kwargs):
+        calls.append(path)
+        return Response()
+
+    monkeypatch.setattr(line_handler, "scraper_request", fake_request)
+    monkeypatch.setattr(line_handler, "recommend_profiles", line_handler.SavedProfileCache())
+    monkeypatch.setattr(line_handler.menu_cache, "snapshot", MenuSnapshot(MENU, "v1", time.monotonic()))
+
+    asyncio.run(line_handler.recommend_beers("alice"))
+    asyncio.run(line_handler.recommend_beers("alice"))
+    assert len(calls) == 1
+
+    line_handler.recommend_profiles.invalidate("alice")
+    asyncio.run(line_handler.recommend_beers("alice"))
+    assert len(calls) == 2
@@ -0,0 +1,102 @@
+from app.flex_messages import decode_postback
+from app.line_handler import SavedBeersCache, build_saved_beers_message
+from app.models import Beer
+
+# Line rejects a reply whose postback data is longer than this
+MAX_POSTBACK_DATA = 300
+
+
+def buttons(message):
+    for bubble in message["contents"]["contents"]:
+        for component in bubble.get("footer", {}).get("contents", []):
+            if component.get("type") == "button":
+                yield component["action"]
+
+
+def test_delete_buttons_fit_line_postback_limit_with_long_japanese_names():
+    beers = []
+    for i in range(10):
+        beer = Beer("限定醸造ダブルインペリアルスタウト樽熟成" * 5, "醸造所" * 10, "Stout - Imperial / Double", "12%")
+        beer.id, beer.saved_at = 1000 + i, f"2026-01-01T00:00:{i:02d}"
+        beers.append(beer)
+
+    message = build_saved_beers_message(beers, "2026-01-01T00:00:00|1000")
+    actions = list(buttons(message))
+    assert actions
+    for action in actions:
+        assert len(action["data"]) <= MAX_POSTBACK_DATA
+        assert decode_postback(action["data"]) is not None
+    assert decode_postback(actions[0]["data"]) == {"action": "delete_beer", "id": 1000}
+    assert decode_postback("d:p0123456789ab") == {"action": "delete_beer", "id": "p0123456789ab"}
+
+
+def saved(name, beer_id, saved_at="2026-01-01T00:00:00"):
+    beer = Beer(name, "Hage & Hige Brewing", "IPA - American", "6.5%")
+    beer.id, beer.saved_at = beer_id, saved_at
+    return beer
+
+
+def test_saving_a_beer_already_on_the_list_does_not_add_a_second_bubble():
+    cache = SavedBeersCache()
+    cache.put("alice", "", [saved("Titan IPA", 1), saved("Kyoto Stout", 2)], None, '"v1"')
+
+    cache.add_beer("alice", saved("Titan IPA", "p0123456789ab"))
+    assert [beer.name for beer in cache.get("alice", "").beers] == ["Titan IPA", "Kyoto Stout"]
+
+    cache.add_beer("alice", saved("Titan Pale", "p0123456789ac"))
+    assert [beer.name for beer in cache.get("alice", "").beers] == ["Titan Pale", "Titan IPA", "Kyoto Stout"]
+
+
+def test_saving_with_uncached_older_pages_invalidates_instead_of_patching():
+    cache = SavedBeersCache()
+    cache.put("alice", "", [saved("Titan IPA", 1)], "2026-01-01T00:00:01|1", '"v1"')
+
+    # "Older Beer" may already be saved on the next page, which isn't cached
+    cache.add_beer("alice", saved("Older Beer", "p0123456789ab"))
+    assert cache.get("alice", "") is None
+
+
+def test_owns_checks_the_users_cached_pages():
+    cache = SavedBeersCache()
+    cache.put("alice", "", [saved("Titan IPA", 1)], None, '"v1"')
+    cache.put("bob", "", [saved("Kyoto Stout", 2)], "2026-01-01T00:00:00|2", '"v1"')
+
+    assert cache.owns("alice", 1) is True
+    # Alice's whole list is cached, so bob's beer can't be hers
+    assert cache.owns("alice", 2) is False
+    # Bob has older pages that aren't cached
+    assert cache.owns("bob", 1) is None
+    assert cache.owns("carol", 1) is None
+
+
+def test_stale_lookups_count_as_stale_hits():
+    cache = SavedBeersCache(ttl=-1)
+    cache.put("alice", "", [saved("Titan IPA", 1)], None, '"v1"')
+
+    assert cache.get("alice", "") is not None
+    assert cache.get("bob", "") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["stale_hits"], stats["misses"]) == (0, 1, 1)
+    assert stats["hit_ratio"] == 0.5
+
+
+def test_patching_a_page_that_evicts_a_sibling_page_does_not_fail():
+    cache = SavedBeersCache()
+    # The same placeholder on both pages, so whichever is patched first evicts the other
+    cache.put("alice", "", [saved("Titan IPA", "p0123456789ab")], "2026-01-01T00:00:00|1", '"v1"')
+    cache.put("alice", "c1", [saved("Titan IPA", "p0123456789ab")], None, '"v1"')
+    # Room for both pages as they are, but not once a longer id is patched in
+    cache.max_bytes = cache.stats()["bytes"] + 1
+
+    cache.resolve_id("alice", "p0123456789ab", 12345678901234567890, "2026-01-01T00:00:00")
+    assert cache.stats()["entries"] == 1
+    assert cache.stats()["bytes"] <= cache.max_bytes
+
+
+def test_owns_is_unknown_from_expired_pages():
+    cache = SavedBeersCache(ttl=-1)
+    cache.put("alice", "", [saved("Titan IPA", 1)], None, '"v1"')
+
+    assert cache.owns("alice", 1) is True
+    # Another worker may have saved beer 2 since the page was fetched
+    assert cache.owns("alice", 2) is None
@@ -0,0 +1,28 @@
+import time
+
+from app.models import Beer
+from app.scraper import MenuCache, MenuSnapshot, menu_hash
+from app.shared_snapshot import SharedMenuSnapshot
+
+
+def test_follower_resolves_a_version_the_leader_just_published(tmp_path):
+    path = str(tmp_path / "menu.snapshot")
+    leader = MenuCache(shared=SharedMenuSnapshot(path), shared_poll_interval=3600)
+    follower = MenuCache(shared=SharedMenuSnapshot(path), shared_poll_interval=3600)
+    assert leader.shared.try_lead()
+
+    beers = [Beer("Titan IPA", "Hage & Hige Brewing", "IPA - American", "6.5%", "3.90")]
+    old = MenuSnapshot(beers, menu_hash(beers), time.monotonic())
+    leader._publish(old)
+    follower._poll_shared(force=True)
+    assert follower.snapshot.version == old.version
+
+    beers = beers + [Beer("Kyoto Stout", "Kyoto Brewing Co.", "Stout - Imperial / Double", "9.0%", "4.10")]
+    new = MenuSnapshot(beers, menu_hash(beers), time.monotonic())
+    leader._publish(new)
+
+    # A save tapped on the leader's new carousel lands on the follower before its next poll
+    snapshot = follower.snapshot_for(new.version)
+    assert snapshot is not None and len(snapshot.beers) == 2
+    assert follower.snapshot_for("unknown") is None
+    leader.shared.release()
@@ -0,0 +1,110 @@
+import asyncio
+import json
+
+from app import write_behind
+from app.write_behind import DELETE_NOT_OWNER, DELETE_QUEUED, DELETE_UNKNOWN, WriteBehindQueue
+
+BEER = {"beer_name": "Titan IPA", "brewery": "Hage & Hige Brewing", "style": "IPA - American"}
+
+
+def make_queue() -> WriteBehindQueue:
+    return WriteBehindQueue(spool_path="")
+
+
+def test_delete_of_another_users_pending_save_is_rejected():
+    queue = make_queue()
+    pending = queue.save("alice", BEER)
+
+    assert queue.delete("bob", pending["id"]) == DELETE_NOT_OWNER
+    assert pending["id"] in queue._saves
+    assert queue.stats()["cancelled"] == 0
+
+    # Alice's double tap still coalesces with her pending save
+    assert queue.save("alice", BEER) is pending
+    assert queue.delete("alice", pending["id"]) == DELETE_QUEUED
+    assert queue.pending_count() == 0
+
+
+def test_delete_of_another_users_inflight_save_is_rejected():
+    queue = make_queue()
+    pending = queue.save("alice", BEER)
+    queue._inflight, queue._saves, queue._save_keys = queue._saves, type(queue._saves)(), {}
+
+    assert queue.delete("bob", pending["id"]) == DELETE_NOT_OWNER
+    assert pending["id"] not in queue._cancel_after_flush
+    assert queue.delete("alice", pending["id"]) == DELETE_QUEUED
+    assert pending["id"] in queue._cancel_after_flush
+
+
+def test_delete_of_an_unknown_placeholder_is_not_reported_as_queued():
+    queue = make_queue()
+
+    # e.g. a "my beers" button rendered before a restart
+    assert queue.delete("alice", "p0123456789ab") == DELETE_UNKNOWN
+    assert queue.pending_count() == 0
+    assert queue.delete("alice", 42) == DELETE_QUEUED
+
+
+def test_flush_ignores_unknown_refs_in_bulk_response(monkeypatch):
+    queue = make_queue()
+    pending = queue.save("alice", BEER)
+
+    class Response:
+        def json(self):
+            return {"saved": {pending["id"]: {"id": 7}, "p-unknown": {"id": 8}}}
+
+    async def fake_request(method, path, **kwargs):
+        return Response()
+
+    monkeypatch.setattr(write_behind, "scraper_request", fake_request)
+    assert asyncio.run(queue.flush()) is True
+    assert queue.resolved_id(pending["id"]) == 7
+
+
+def test_flush_sends_at_most_batch_size_writes_per_request(monkeypatch):
+    queue = WriteBehindQueue(batch_size=3, spool_path="")
+    for i in range(4):
+        queue.save("alice", {**BEER, "beer_name": f"Titan IPA {i}"})
+    queue.delete("alice", 41)
+    queue.delete("alice", 42)
+    payloads = []
+
+    class Response:
+        def __init__(self, payload):
+            self.payload = payload
+
+        def json(self):
+            return {"saved": {save["ref"]: {"id": 100 + n} for n, save in enumerate(self.payload["saves"])}}
+
+    async def fake_request(method, path, json=None, **kwargs):
+        payloads.append(json)
+        return Response(json)
+
+    monkeypatch.setattr(write_behind, "scraper_request", fake_request)
+    assert asyncio.run(queue.flush()) is True
+    assert [len(p["deletes"]) + len(p["saves"]) for p in payloads] == [3, 3]
+    assert [len(p["deletes"]) for p in payloads] == [2, 0]
+    assert queue.pending_count() == 0 and not queue._save_keys
+
+
+def test_spool_write_failure_is_logged_not_raised(tmp_path, caplog):
+    queue = WriteBehindQueue(spool_path=str(tmp_path / "missing" / "spool.json"))
+    queue.save("alice", BEER)
+
+    queue._write_spool()
+    assert "Dropping 1 unflushed writes" in caplog.text
+    assert not (tmp_path / "missing").exists()
+
+
+def test_malformed_spool_entries_are_skipped(tmp_path, caplog):
+    spool = tmp_path / "spool.json"
+    spool.write_text(json.dumps({
+        "saves": [{**BEER, "id": "p0123456789ab", "user_id": "alice"}, {**BEER, "user_id": "bob"}, "junk"],
+        "deletes": [{"id": 7, "user_id": "alice"}, {"id": 8}, None],
+    }))
+    queue = WriteBehindQueue(spool_path=str(spool))
+
+    queue._load_spool()
+    assert list(queue._saves) == ["p0123456789ab"]
+    assert list(queue._deletes) == [("alice", 7)]
+    assert "Skipped 4 malformed writes" in caplog.text